@@ -0,0 +1,182 @@
+import hashlib
+import json
+from types import MappingProxyType
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from taggit.models import Tag
+
+from content.models import City, PlatformAbout, Skills, Valuation
+from projects.models import Category
+
+from .profiling import count_cache
+
+PLATFORM_ABOUT_CACHE_KEY = 'platform_about'
+PLATFORM_COUNTER_CACHE_KEY = 'platform_about:{}'
+# Счетчики информации о Платформе, поддерживаются сигналами
+PLATFORM_COUNTERS = ('projects_count', 'volunteers_count', 'organizers_count')
+REFERENCE_VERSION_CACHE_KEY = 'reference:{}:version'
+REFERENCE_DATA_CACHE_KEY = 'reference:{}:{}'
+
+REFERENCE_MODELS = {
+    'cities': City,
+    'skills': Skills,
+    'categories': Category,
+    'tags': Tag,
+}
+
+# Копии справочников в памяти процесса: {(вид, справочник): (версия, данные)}
+_local_cache = {}
+
+
+def make_etag(data):
+    """
+    Вычисляет ETag по содержимому ответа.
+    """
+    content = json.dumps(data, sort_keys=True, default=str)
+    return '"{}"'.format(hashlib.md5(content.encode()).hexdigest())
+
+
+def refresh_platform_about():
+    """
+    Собирает информацию о Платформе и заново считает счетчики проектов,
+    волонтеров и организаций, сохраняет их в кеш отдельными ключами.
+    """
+    from .serializers import PlatformAboutSerializer  # noqa
+
+    platform_about = PlatformAbout.objects.latest('id')
+    data = PlatformAboutSerializer({
+        'about_us': platform_about.about_us,
+        'platform_email': platform_about.platform_email,
+        'valuations': Valuation.objects.all()[
+            :settings.VALUATIONS_ON_PAGE_ABOUT_US
+        ],
+    }).data
+    about = {
+        name: value for name, value in data.items()
+        if name not in PLATFORM_COUNTERS
+    }
+    values = {PLATFORM_ABOUT_CACHE_KEY: about}
+    for name in PLATFORM_COUNTERS:
+        values[PLATFORM_COUNTER_CACHE_KEY.format(name)] = data[name]
+    cache.set_many(values, settings.PLATFORM_ABOUT_CACHE_TIMEOUT)
+    return make_platform_about_payload(about, data)
+
+
+def make_platform_about_payload(about, counters):
+    data = {
+        **about,
+        **{name: counters[name] for name in PLATFORM_COUNTERS},
+    }
+    return {'data': data, 'etag': make_etag(data)}
+
+
+def get_platform_about():
+    """
+    Возвращает информацию о Платформе и счетчики одним чтением из кеша,
+    при промахе любого ключа пересобирает все.
+    """
+    keys = [PLATFORM_ABOUT_CACHE_KEY] + [
+        PLATFORM_COUNTER_CACHE_KEY.format(name) for name in PLATFORM_COUNTERS
+    ]
+    values = cache.get_many(keys)
+    count_cache('platform_about', len(values) == len(keys))
+    if len(values) < len(keys):
+        return refresh_platform_about()
+    return make_platform_about_payload(
+        values[PLATFORM_ABOUT_CACHE_KEY],
+        {
+            name: values[PLATFORM_COUNTER_CACHE_KEY.format(name)]
+            for name in PLATFORM_COUNTERS
+        },
+    )
+
+
+def change_platform_counter(name, delta):
+    """
+    Атомарно меняет счетчик Платформы на delta.
+
+    Если счетчика нет в кеше, он будет посчитан заново при следующем
+    чтении. Возможное расхождение (пересчет прочитал данные до фиксации
+    изменения) исправляет периодическая задача
+    refresh_platform_about_cache.
+    """
+    try:
+        cache.incr(PLATFORM_COUNTER_CACHE_KEY.format(name), delta)
+    except ValueError:
+        pass
+
+
+def invalidate_platform_about():
+    cache.delete_many([PLATFORM_ABOUT_CACHE_KEY] + [
+        PLATFORM_COUNTER_CACHE_KEY.format(name) for name in PLATFORM_COUNTERS
+    ])
+
+
+def get_reference_name(model):
+    for name, reference_model in REFERENCE_MODELS.items():
+        if reference_model is model:
+            return name
+    return None
+
+
+def bump_reference_version(name):
+    """
+    Меняет версию справочника, после чего все процессы перечитают его.
+    """
+    version = uuid4().hex
+    cache.set(REFERENCE_VERSION_CACHE_KEY.format(name), version, None)
+    return version
+
+
+def get_reference_version(name):
+    version = cache.get(REFERENCE_VERSION_CACHE_KEY.format(name))
+    count_cache('reference_version', version is not None)
+    if version is None:
+        version = bump_reference_version(name)
+    return version
+
+
+def get_reference_data(name, serializer_class):
+    """
+    Возвращает версию и сериализованное содержимое справочника.
+
+    Данные берутся из памяти процесса, если версия в Redis не изменилась,
+    затем из Redis и только после этого из БД.
+    """
+    version = get_reference_version(name)
+    local = _local_cache.get(('data', name))
+    if local is not None and local[0] == version:
+        count_cache('reference_data', True)
+        return local
+    data_key = REFERENCE_DATA_CACHE_KEY.format(name, version)
+    data = cache.get(data_key)
+    count_cache('reference_data', data is not None)
+    if data is None:
+        data = json.loads(json.dumps(serializer_class(
+            REFERENCE_MODELS[name].objects.all(), many=True
+        ).data))
+        cache.set(data_key, data, settings.REFERENCE_CACHE_TIMEOUT)
+    _local_cache[('data', name)] = (version, data)
+    return version, data
+
+
+def get_reference_instances(name):
+    """
+    Возвращает словарь {pk: объект} справочника из памяти процесса,
+    перечитывая его одним запросом при смене версии.
+
+    Словарь и объекты общие для всего процесса: словарь доступен только
+    для чтения, объект перед передачей дальше нужно копировать.
+    """
+    version = get_reference_version(name)
+    local = _local_cache.get(('instances', name))
+    count_cache(
+        'reference_instances', local is not None and local[0] == version
+    )
+    if local is not None and local[0] == version:
+        return local[1]
+    instances = MappingProxyType(REFERENCE_MODELS[name].objects.in_bulk())
+    _local_cache[('instances', name)] = (version, instances)
+    return instances
@@ -1,8 +1,9 @@
 import django_filters
-from django.db.models import Q
-from django.utils import timezone
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.exceptions import ParseError
+from rest_framework.filters import SearchFilter
 from taggit.models import Tag
 
 from content.models import City, Skills
@@ -57,6 +58,59 @@ class TagFilter(FilterSet):
         fields = ('name',)
 
 
+class ProjectFullTextSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск проектов по полю search_vector.
+
+    Использует GIN индекс и русскую морфологию, результаты сортируются
+    по релевантности: название важнее цели проекта, цель важнее описания.
+    Пример запроса /search/?search=уборка парка
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        query = SearchQuery(
+            ' '.join(search_terms),
+            config=Project.SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', 'id')
+        )
+
+
+class ManyToManySubqueryFilter(filters.ModelMultipleChoiceFilter):
+    """
+    Фильтр по связи многие-ко-многим через подзапрос к промежуточной таблице.
+
+    Не добавляет к основному запросу JOIN и DISTINCT. В режиме conjoined
+    отбирает объекты, связанные со всеми переданными значениями, одним
+    сгруппированным подзапросом с HAVING COUNT вместо JOIN на каждое значение.
+    """
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        field = qs.model._meta.get_field(self.field_name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        values = set(value)
+        subquery = field.remote_field.through.objects.filter(
+            **{f'{target}__in': values}
+        )
+        if self.conjoined:
+            subquery = (
+                subquery.values(source)
+                .annotate(matches=Count(target))
+                .filter(matches=len(values))
+            )
+        return qs.filter(pk__in=subquery.values(source))
+
+
 class ProjectFilter(FilterSet):
     """
     Класс для фильтрации проектов по имени, статусу, категории, организации.
@@ -67,21 +121,23 @@ class ProjectFilter(FilterSet):
     - /projects/?city={id_city}
     - /projects/?start_datetime=01.01.2023
     - /projects/?end_datetime=31.12.2023
+    - /projects/?skills=1&skills=2&conjoined=true
+      (проект должен содержать все указанные навыки и категории)
+    - /projects/?status=ready_for_feedback
     """
 
-    categories = filters.ModelMultipleChoiceFilter(
+    categories = ManyToManySubqueryFilter(
         queryset=Category.objects.all(),
         field_name='categories',
         to_field_name='id',
-        # conjoined=True
     )
 
-    skills = filters.ModelMultipleChoiceFilter(
+    skills = ManyToManySubqueryFilter(
         queryset=Skills.objects.all(),
         field_name='skills',
         to_field_name='id',
-        # conjoined=True,  # все указанные навыки должны быть одновременно в проекте
     )
+    conjoined = filters.BooleanFilter(method='filter_conjoined')
 
     city = django_filters.CharFilter(field_name='city', lookup_expr='exact')
     start_datetime = django_filters.DateTimeFilter(
@@ -90,11 +146,26 @@ class ProjectFilter(FilterSet):
     end_datetime = django_filters.DateTimeFilter(
         field_name='end_datetime', lookup_expr='lte'
     )
+    status = django_filters.ChoiceFilter(
+        choices=Project.LIFECYCLE_STATUS_CHOICES, method='filter_status'
+    )
+
+    def filter_status(self, queryset, name, value):
+        return queryset.filter_status(value)
+
+    def filter_conjoined(self, queryset, name, value):
+        """
+        Режим применяется фильтрами категорий и навыков.
+        """
+        return queryset
 
     def filter_queryset(self, queryset):
-        for name, value in self.data.items():
+        conjoined = bool(self.form.cleaned_data.get('conjoined'))
+        self.filters['categories'].conjoined = conjoined
+        self.filters['skills'].conjoined = conjoined
+        for name, value in self.form.cleaned_data.items():
             try:
-                queryset = super().filter_queryset(queryset)
+                queryset = self.filters[name].filter(queryset, value)
             except (ValueError, self.Meta.model.DoesNotExist):
                 raise ParseError("Invalid filter value for {}".format(name))
 
@@ -105,9 +176,11 @@ class ProjectFilter(FilterSet):
         fields = [
             'categories',
             'skills',
+            'conjoined',
             'city',
             'start_datetime',
             'end_datetime',
+            'status',
         ]
 
 
@@ -130,120 +203,11 @@ class StatusProjectFilter(django_filters.FilterSet):
     по фильтру "Избранное" /projects/me/?is_favorited=true.
     """
 
-    def filter_draft(self, queryset):
-        """
-        Фильтр для таба "Черновик".
-        """
-        return queryset.filter(
-            Q(status_approve__in=[Project.EDITING, Project.REJECTED,]),
-            organization__contact_person=self.request.user
-        )
-
-    def filter_active(self, queryset):
-        """
-        Фильтр для таба "Активен".
-        """
-        now = timezone.now()
-        return queryset.filter(
-            Q(status_approve=Project.APPROVED), end_datetime__gt=now,
-            organization__contact_person=self.request.user
-        )
-
-    def filter_completed(self, queryset):
-        """
-        Фильтр для таба "Завершен".
-        """
-        now = timezone.now()
-        return queryset.filter(
-            Q(status_approve=Project.APPROVED), end_datetime__lte=now,
-            organization__contact_person=self.request.user
-        )
-
-    def filter_archive(self, queryset):
-        """
-        Фильтр для таба "Архив".
-        """
-
-        return queryset.filter(
-            Q(status_approve=Project.CANCELED_BY_ORGANIZER),
-            organization__contact_person=self.request.user
-        )
-
-    def filter_moderation(self, queryset):
-        """
-        Фильтр для таба "На модерации".
-        """
-
-        return queryset.filter(
-            Q(status_approve=Project.PENDING),
-            organization__contact_person=self.request.user
-        )
-
-    def filter_is_favorited(self, queryset):
-        """
-        Фильтр для таба "Избранные".
-        """
-
-        return queryset.filter(Q(project_favorite__user=self.request.user))
-
-    def filter_active_volunteer(self, queryset):
-        """
-        Фильтр для таба "Активен".
-        """
-        now = timezone.now()
-        return queryset.filter(
-            Q(status_approve=Project.APPROVED), end_datetime__gt=now,
-            participants__volunteer=self.request.user.volunteers
-        )
-
-    def filter_completed_volunteer(self, queryset):
-        """
-        Фильтр для таба "Завершен".
-        """
-        now = timezone.now()
-        return queryset.filter(
-            Q(status_approve=Project.APPROVED), end_datetime__lte=now,
-            participants__volunteer=self.request.user.volunteers
-        )
-
-    def filter_archive_volunteer(self, queryset):
-        """
-        Фильтр для таба "Архив".
-        """
-
-        return queryset.filter(
-            Q(status_approve=Project.CANCELED_BY_ORGANIZER),
-            participants__volunteer=self.request.user.volunteers
-        )
-
     def filter_queryset(self, queryset):
-        user = self.request.user
-        status_filter = None
-
-        if user.is_organizer:
-            status_filter = (
-                self.data.get('draft') and self.filter_draft
-                or self.data.get('active') and self.filter_active
-                or self.data.get('completed') and self.filter_completed
-                or self.data.get('archive') and self.filter_archive
-                or self.data.get('moderation') and self.filter_moderation
-                or self.data.get('is_favorited') and self.filter_is_favorited
-            )
-        elif user.is_volunteer:
-            status_filter = (
-                self.data.get('active')
-                and self.filter_active_volunteer
-                or self.data.get('completed')
-                and self.filter_completed_volunteer
-                or self.data.get('archive')
-                and self.filter_archive_volunteer
-                or self.data.get('is_favorited')
-                and self.filter_is_favorited
-            )
-
-        if status_filter:
-            queryset = status_filter(queryset).distinct()
-
+        tabs, _ = queryset.cabinet_tabs(self.request.user)
+        for tab, condition in tabs.items():
+            if self.data.get(tab):
+                return queryset.filter(condition)
         return queryset
 
     class Meta:
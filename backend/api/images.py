@@ -0,0 +1,151 @@
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Поля изображений, для которых готовятся уменьшенные варианты. Рядом
+# с каждым полем модель хранит JSONField <поле>_variants.
+IMAGE_FIELDS = {
+    'projects.Project': ('picture',),
+    'projects.Organization': ('photo',),
+    'projects.Volunteer': ('photo',),
+    'projects.ProjectImage': ('photo',),
+    'content.News': ('picture',),
+}
+VARIANT_PATH = 'variants/{}/{}.{}'
+
+
+def get_variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def get_image_fields(model):
+    return IMAGE_FIELDS.get(model._meta.label, ())
+
+
+def needs_processing(instance, field_name):
+    """
+    Изображение задано, а варианты для него еще не готовы.
+    """
+    image = getattr(instance, field_name)
+    variants = getattr(instance, get_variants_field(field_name))
+    return bool(image) and variants.get('source') != image.name
+
+
+def to_rgb(image):
+    """
+    JPEG не поддерживает прозрачность: прозрачные области заливаются
+    белым.
+    """
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def save_variant(image, path, image_format):
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=settings.IMAGE_VARIANT_QUALITY,
+        optimize=image_format == 'JPEG',
+    )
+    # Повторная обработка того же файла перезаписывает варианты
+    default_storage.delete(path)
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def make_variants(name):
+    """
+    Создает варианты изображения всех размеров IMAGE_VARIANT_SIZES во всех
+    форматах IMAGE_VARIANT_FORMATS.
+
+    Метаданные (EXIF с координатами съемки и т.п.) в варианты не
+    попадают, ориентация из EXIF применяется к пикселям. Изображения
+    меньше размера варианта не увеличиваются.
+    """
+    stem = os.path.splitext(name)[0]
+    largest = max(settings.IMAGE_VARIANT_SIZES.values())
+    with default_storage.open(name) as file, Image.open(file) as source:
+        # Декодер JPEG сразу уменьшает большие снимки кратно 2
+        source.draft('RGB', (largest, largest))
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert(
+                'RGBA' if source.mode in ('LA', 'P') else 'RGB'
+            )
+        sizes = {}
+        for size, limit in sorted(
+            settings.IMAGE_VARIANT_SIZES.items(), key=lambda item: item[1]
+        ):
+            image = source.copy()
+            image.thumbnail((limit, limit), Image.LANCZOS)
+            files = {}
+            for extension, image_format in (
+                settings.IMAGE_VARIANT_FORMATS.items()
+            ):
+                files[extension] = save_variant(
+                    image if image_format == 'WEBP' else to_rgb(image),
+                    VARIANT_PATH.format(stem, size, extension),
+                    image_format,
+                )
+            sizes[size] = {
+                'width': image.width,
+                'height': image.height,
+                'files': files,
+            }
+    return {'source': name, 'sizes': sizes}
+
+
+def delete_variants(variants):
+    for variant in variants.get('sizes', {}).values():
+        for path in variant['files'].values():
+            default_storage.delete(path)
+
+
+def process_image(model_label, pk, field_name, force=False):
+    """
+    Готовит варианты изображения из поля field_name объекта и сохраняет
+    их описание в поле <field_name>_variants.
+
+    Описание сохраняется, только если изображение не сменилось за время
+    обработки. Возвращает True, если варианты созданы.
+    """
+    model = apps.get_model(model_label)
+    variants_field = get_variants_field(field_name)
+    instance = model.objects.filter(pk=pk).only(
+        field_name, variants_field
+    ).first()
+    if instance is None or not getattr(instance, field_name):
+        return False
+    if not force and not needs_processing(instance, field_name):
+        return False
+    name = getattr(instance, field_name).name
+    try:
+        variants = make_variants(name)
+    except (OSError, Image.DecompressionBombError) as error:
+        logger.warning(
+            'Cannot process image %s of %s %s: %r',
+            name, model_label, pk, error,
+        )
+        return False
+    updated = model.objects.filter(pk=pk, **{field_name: name}).update(
+        **{variants_field: variants}
+    )
+    if not updated:
+        delete_variants(variants)
+        return False
+    previous = getattr(instance, variants_field)
+    if previous.get('source') != name:
+        delete_variants(previous)
+    return True
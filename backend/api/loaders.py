@@ -0,0 +1,345 @@
+import json
+import os
+from collections import Counter
+from contextlib import nullcontext
+from csv import DictReader
+from datetime import date, datetime, time
+from graphlib import TopologicalSorter
+from io import StringIO
+from itertools import islice
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import FileField, JSONField, Q, UniqueConstraint
+from django.utils import timezone
+from psycopg2.extras import Json
+
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def get_load_order(models):
+    """
+    Сортирует модели так, чтобы таблицы, на которые ссылаются внешние
+    ключи, загружались раньше ссылающихся на них.
+    """
+    models = list(models)
+    graph = {
+        model: {
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in models
+            and field.related_model is not model
+        }
+        for model in models
+    }
+    return list(TopologicalSorter(graph).static_order())
+
+
+def read_batches(file_path, batch_size):
+    """
+    Читает csv файл пачками по batch_size строк, не загружая его
+    целиком в память.
+    """
+    with open(file_path, encoding='utf-8-sig') as csv_file:
+        reader = DictReader(csv_file)
+        while True:
+            batch = list(islice(reader, batch_size))
+            if not batch:
+                return
+            yield reader.fieldnames, batch
+
+
+def copy_value(value):
+    """
+    Представление значения в текстовом формате COPY.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Json):
+        # str() дал бы SQL литерал в кавычках, а COPY ждет сам JSON
+        value = value.dumps(value.adapted)
+    return str(value).translate(COPY_ESCAPES)
+
+
+def normalize_value(field, value):
+    """
+    Приводит значение из csv и значение из базы к одному виду
+    для сравнения.
+    """
+    if isinstance(field, FileField):
+        return str(value or '')
+    value = field.to_python(value)
+    if (
+        isinstance(value, datetime)
+        and settings.USE_TZ
+        and timezone.is_naive(value)
+    ):
+        value = timezone.make_aware(value)
+    return value
+
+
+def is_auto_timestamp(field):
+    return getattr(field, 'auto_now', False) or getattr(
+        field, 'auto_now_add', False
+    )
+
+
+def has_unique_constraint(model, fields):
+    """
+    Проверяет, что на поля fields в базе есть ограничение уникальности,
+    нужное для INSERT ... ON CONFLICT.
+    """
+    names = {field.name for field in fields}
+    if len(fields) == 1 and (fields[0].unique or fields[0].primary_key):
+        return True
+    return any(
+        set(constraint.fields) == names
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint)
+        and constraint.condition is None
+    ) or any(
+        set(together) == names for together in model._meta.unique_together
+    )
+
+
+class CsvLoader:
+    """
+    Потоковая загрузка csv файлов в таблицы моделей.
+
+    Строки читаются и записываются пачками по batch_size через
+    bulk_create или, при use_copy, через COPY FROM STDIN. Таблицы
+    загружаются в порядке зависимостей внешних ключей, каждая в своей
+    транзакции (atomic='table') или все в одной (atomic='global').
+    После загрузки последовательности первичных ключей сдвигаются
+    за максимальные значения.
+
+    В режиме upsert строки сопоставляются с существующими по
+    естественному ключу из natural_keys (для моделей без ключа - по
+    всем колонкам csv): новые добавляются, измененные обновляются,
+    совпадающие пропускаются, поэтому повторная загрузка не создает
+    дублей. Повторы ключа внутри пачки учитываются как duplicates.
+    При dry_run считается только статистика, база не изменяется.
+    """
+
+    def __init__(self, tables, data_dir, batch_size=1000, use_copy=False,
+                 atomic='table', using='default', upsert=False,
+                 natural_keys=None, dry_run=False):
+        self.tables = tables
+        self.data_dir = data_dir
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.atomic = atomic
+        self.using = using
+        self.upsert = upsert
+        self.natural_keys = natural_keys or {}
+        self.dry_run = dry_run
+        self.connection = connections[using]
+        self.current_model = None
+
+    def build_instance(self, model, row):
+        data = {}
+        for name, value in row.items():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if value == '' and field is not None and field.null:
+                value = None
+            elif isinstance(field, JSONField):
+                # В csv JSON хранится текстом
+                value = json.loads(value) if value else field.get_default()
+            data[name] = value
+        return model(**data)
+
+    def get_copy_fields(self, model, header):
+        return [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+            or field.name in header
+            or field.attname in header
+        ]
+
+    def insert_batch(self, model, header, instances):
+        model.objects.using(self.using).bulk_create(instances)
+
+    def copy_batch(self, model, header, instances):
+        fields = self.get_copy_fields(model, header)
+        buffer = StringIO()
+        for instance in instances:
+            buffer.write('\t'.join(
+                copy_value(field.get_db_prep_save(
+                    field.pre_save(instance, add=True), self.connection
+                ))
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+        quote = self.connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {quote(model._meta.db_table)} ({columns}) '
+                f'FROM STDIN',
+                buffer,
+            )
+
+    def get_header_fields(self, model, header):
+        return [
+            field for field in model._meta.concrete_fields
+            if field.name in header or field.attname in header
+        ]
+
+    def get_key_fields(self, model, header):
+        if model in self.natural_keys:
+            return [
+                model._meta.get_field(name)
+                for name in self.natural_keys[model]
+            ]
+        return [
+            field for field in self.get_header_fields(model, header)
+            if not field.primary_key and not is_auto_timestamp(field)
+        ]
+
+    def get_key(self, instance, fields):
+        return tuple(
+            normalize_value(field, getattr(instance, field.attname))
+            for field in fields
+        )
+
+    def get_existing(self, model, key_fields, instances):
+        """
+        Существующие строки с ключами из пачки, одним запросом.
+        """
+        if len(key_fields) == 1:
+            attname = key_fields[0].attname
+            query = Q(**{f'{attname}__in': [
+                getattr(instance, attname) for instance in instances
+            ]})
+        else:
+            query = Q()
+            for instance in instances:
+                query |= Q(**{
+                    field.attname: getattr(instance, field.attname)
+                    for field in key_fields
+                })
+        return {
+            self.get_key(instance, key_fields): instance
+            for instance in model.objects.using(self.using).filter(query)
+        }
+
+    def upsert_batch(self, model, header, instances, stats):
+        key_fields = self.get_key_fields(model, header)
+        update_fields = [
+            field for field in self.get_header_fields(model, header)
+            if field not in key_fields
+            and not field.primary_key
+            and not is_auto_timestamp(field)
+        ]
+        # Для повторов ключа внутри пачки остается последняя строка
+        unique = {
+            self.get_key(instance, key_fields): instance
+            for instance in instances
+        }
+        stats['duplicates'] += len(instances) - len(unique)
+        instances = list(unique.values())
+        existing = self.get_existing(model, key_fields, instances)
+        created, updated = [], []
+        for instance in instances:
+            current = existing.get(self.get_key(instance, key_fields))
+            if current is None:
+                created.append(instance)
+            elif any(
+                normalize_value(field, getattr(instance, field.attname))
+                != normalize_value(field, getattr(current, field.attname))
+                for field in update_fields
+            ):
+                updated.append((instance, current.pk))
+        stats['created'] += len(created)
+        stats['updated'] += len(updated)
+        stats['unchanged'] += len(instances) - len(created) - len(updated)
+        if self.dry_run or not (created or updated):
+            return
+        manager = model.objects.using(self.using)
+        if has_unique_constraint(model, key_fields) and update_fields:
+            manager.bulk_create(
+                created + [instance for instance, _ in updated],
+                update_conflicts=True,
+                unique_fields=[field.name for field in key_fields],
+                update_fields=[field.name for field in update_fields],
+            )
+            return
+        if updated:
+            for instance, pk in updated:
+                instance.pk = pk
+            manager.bulk_update(
+                [instance for instance, _ in updated],
+                [field.name for field in update_fields],
+            )
+        if created:
+            manager.bulk_create(created)
+
+    def load_table(self, model):
+        """
+        Загружает csv файл модели, возвращает статистику по строкам.
+        """
+        file_path = os.path.join(self.data_dir, self.tables[model])
+        stats = Counter()
+        for header, batch in read_batches(file_path, self.batch_size):
+            instances = [self.build_instance(model, row) for row in batch]
+            stats['rows'] += len(batch)
+            if self.upsert:
+                self.upsert_batch(model, header, instances, stats)
+                continue
+            stats['created'] += len(instances)
+            if self.dry_run:
+                continue
+            if self.use_copy:
+                self.copy_batch(model, header, instances)
+            else:
+                self.insert_batch(model, header, instances)
+        return stats
+
+    def reset_sequences(self, models):
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), models
+        )
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def load(self):
+        """
+        Загружает все таблицы, по мере загрузки возвращает
+        (модель, статистика по строкам, секунды).
+        """
+        models = get_load_order(self.tables)
+        global_atomic = (
+            transaction.atomic(using=self.using)
+            if self.atomic == 'global' else nullcontext()
+        )
+        with global_atomic:
+            for model in models:
+                self.current_model = model
+                start = perf_counter()
+                table_atomic = (
+                    transaction.atomic(using=self.using)
+                    if self.atomic == 'table' else nullcontext()
+                )
+                with table_atomic:
+                    stats = self.load_table(model)
+                yield model, stats, perf_counter() - start
+            if not self.dry_run:
+                self.reset_sequences(models)
@@ -0,0 +1,152 @@
+import json
+import subprocess
+from functools import partial
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks.clients import HttpClient, InProcessClient
+from benchmarks.journeys import JOURNEYS, load_fixtures
+from benchmarks.runner import compare, run_load
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive scripted user journeys against the API from several '
+        'threads and report latency percentiles, throughput and SQL '
+        'queries per request. By default requests go through the Django '
+        'handler in this process, using the database and cache from the '
+        'settings; --url sends them over HTTP to a running server. '
+        'Journeys create and review incomes, use a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--journeys',
+            default=','.join(JOURNEYS),
+            help=f'Comma separated journeys: {", ".join(JOURNEYS)}',
+        )
+        parser.add_argument(
+            '--users', type=int, default=10, help='Concurrent virtual users'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30, help='Seconds to run'
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://localhost:8000',
+        )
+        parser.add_argument(
+            '--seed-projects',
+            type=int,
+            default=0,
+            help='Run the seed command with this many projects first',
+        )
+        parser.add_argument(
+            '--random-seed', type=int, default=None, help='Random seed'
+        )
+        parser.add_argument('--output', help='Save results to a JSON file')
+        parser.add_argument(
+            '--compare', help='JSON file of a previous run to compare with'
+        )
+
+    def handle(self, *args, **options):
+        journeys = options['journeys'].split(',')
+        unknown = set(journeys) - set(JOURNEYS)
+        if unknown:
+            raise CommandError(f'Unknown journeys: {", ".join(unknown)}')
+        if options['seed_projects']:
+            call_command(
+                'seed',
+                projects=options['seed_projects'],
+                volunteers=options['seed_projects'],
+                organizations=max(options['seed_projects'] // 10, 1),
+                stdout=self.stdout,
+            )
+        fixtures = load_fixtures()
+        if options['url']:
+            make_client = partial(self.make_http_client, options['url'])
+        else:
+            make_client = InProcessClient
+        try:
+            summary = run_load(
+                make_client,
+                fixtures,
+                journeys,
+                options['users'],
+                options['duration'],
+                options['random_seed'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        result = {
+            'meta': {
+                'commit': get_commit(),
+                'created_at': timezone.now().isoformat(),
+                'mode': 'http' if options['url'] else 'in-process',
+                'users': options['users'],
+                'duration': options['duration'],
+                'journeys': journeys,
+            },
+            **summary,
+        }
+        self.print_summary(result)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                self.print_compare(compare(json.load(file), result))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Saved to {options["output"]}')
+
+    def make_http_client(self, url, record, token):
+        return HttpClient(record, url, token)
+
+    def print_summary(self, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{result["meta"]["mode"]}, {result["meta"]["users"]} users, '
+            f'{result["seconds"]} s, journeys {result["journeys"]}'
+        ))
+        self.stdout.write(
+            f'{"endpoint":45} {"req":>6} {"rps":>8} {"p50":>8} '
+            f'{"p95":>8} {"p99":>8} {"sql":>6} statuses'
+        )
+        rows = list(result['endpoints'].items())
+        if result['total']:
+            rows.append(('TOTAL', result['total']))
+        for name, stats in rows:
+            latency = stats['latency_ms']
+            queries = stats['queries']['mean'] if stats['queries'] else '-'
+            self.stdout.write(
+                f'{name:45} {stats["requests"]:>6} '
+                f'{stats["throughput"]:>8} {latency["p50"]:>8} '
+                f'{latency["p95"]:>8} {latency["p99"]:>8} {queries:>6} '
+                f'{stats["statuses"]}'
+            )
+
+    def print_compare(self, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING('Compared to previous'))
+        for row in rows:
+            style = (
+                self.style.ERROR if (row['p95_change'] or 0) > 10
+                else self.style.SUCCESS
+            )
+            self.stdout.write(style(
+                f'{row["endpoint"]:45} p95 {row["p95_before"]} -> '
+                f'{row["p95_after"]} ms ({row["p95_change"]}%), '
+                f'throughput {row["throughput_change"]}%, '
+                f'sql {row["queries_before"]} -> {row["queries_after"]}'
+            ))
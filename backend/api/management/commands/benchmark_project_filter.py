@@ -0,0 +1,92 @@
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import QueryDict
+
+from api.filters import ProjectFilter
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare query plans of the project filter: JOIN per value '
+        'against subqueries to the many-to-many tables'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skills', nargs='*', type=int, default=[])
+        parser.add_argument('--categories', nargs='*', type=int, default=[])
+        parser.add_argument('--conjoined', action='store_true')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only)',
+        )
+
+    def joined_queryset(self, queryset, skills, categories, conjoined):
+        """
+        Прежний план: JOIN к промежуточной таблице на каждое значение
+        в режиме conjoined или один JOIN с DISTINCT.
+        """
+        for field, values in (('categories', categories), ('skills', skills)):
+            if not values:
+                continue
+            if conjoined:
+                for value in values:
+                    queryset = queryset.filter(**{field: value})
+            else:
+                queryset = queryset.filter(**{f'{field}__in': values})
+        return queryset.distinct()
+
+    def filtered_queryset(self, queryset, skills, categories, conjoined):
+        data = QueryDict(mutable=True)
+        data.setlist('skills', skills)
+        data.setlist('categories', categories)
+        if conjoined:
+            data['conjoined'] = 'true'
+        filterset = ProjectFilter(data=data, queryset=queryset)
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_json())
+        return filterset.qs
+
+    def measure(self, queryset, repeat):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            queryset.count()
+            list(queryset.values_list('id', flat=True)[:page_size])
+            timings.append((perf_counter() - start) * 1000)
+        return median(timings), max(timings)
+
+    def handle(self, *args, **options):
+        skills = options['skills']
+        categories = options['categories']
+        conjoined = options['conjoined']
+        if not skills and not categories:
+            raise CommandError('Pass --skills and/or --categories')
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        base = Project.objects.filter(status_approve=Project.APPROVED)
+        plans = {
+            'join': self.joined_queryset(
+                base, skills, categories, conjoined
+            ),
+            'subquery': self.filtered_queryset(
+                base, skills, categories, conjoined
+            ),
+        }
+        for name, queryset in plans.items():
+            median_ms, max_ms = self.measure(queryset, options['repeat'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {queryset.count()} rows, '
+                f'median {median_ms:.2f} ms, max {max_ms:.2f} ms'
+            ))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
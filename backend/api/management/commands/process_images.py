@@ -0,0 +1,72 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from api.images import (
+    IMAGE_FIELDS,
+    get_variants_field,
+    needs_processing,
+    process_image,
+)
+from api.tasks import make_image_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Create thumbnail/card/full WebP and JPEG variants for images '
+        'that have none yet, e.g. after upload or seed, which bypass '
+        'signals. By default jobs are queued to Celery.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models',
+            default=','.join(IMAGE_FIELDS),
+            help=f'Comma separated models: {", ".join(IMAGE_FIELDS)}',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recreate variants that are already up to date',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Process images in this process instead of Celery',
+        )
+
+    def handle(self, *args, **options):
+        labels = options['models'].split(',')
+        unknown = set(labels) - set(IMAGE_FIELDS)
+        if unknown:
+            raise CommandError(f'Unknown models: {", ".join(unknown)}')
+        for label in labels:
+            model = apps.get_model(label)
+            for field_name in IMAGE_FIELDS[label]:
+                queued = processed = 0
+                instances = (
+                    model.objects.exclude(**{field_name: ''})
+                    .exclude(**{f'{field_name}__isnull': True})
+                    .only(field_name, get_variants_field(field_name))
+                    .order_by('pk')
+                )
+                for instance in instances.iterator():
+                    if not options['force'] and not needs_processing(
+                        instance, field_name
+                    ):
+                        continue
+                    if options['sync']:
+                        processed += process_image(
+                            label, instance.pk, field_name, options['force']
+                        )
+                    else:
+                        make_image_variants.delay(
+                            label, instance.pk, field_name, options['force']
+                        )
+                        queued += 1
+                self.stdout.write(
+                    f'{label}.{field_name}: '
+                    + (
+                        f'{processed} processed' if options['sync']
+                        else f'{queued} queued'
+                    )
+                )
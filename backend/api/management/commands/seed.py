@@ -0,0 +1,487 @@
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from random import Random
+from time import perf_counter
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from api.cache import (
+    REFERENCE_MODELS,
+    bump_reference_version,
+    invalidate_platform_about,
+)
+from content.models import City, News, Skills
+from projects.models import (
+    Address,
+    Category,
+    Organization,
+    Project,
+    ProjectFavorite,
+    ProjectIncomes,
+    ProjectParticipants,
+    ProjectSkills,
+    Volunteer,
+    VolunteerSkills,
+)
+from users.models import User
+
+FIRST_NAMES = (
+    'Александр', 'Мария', 'Дмитрий', 'Анна', 'Сергей', 'Елена', 'Иван',
+    'Ольга', 'Андрей', 'Наталья', 'Михаил', 'Татьяна', 'Алексей', 'Ирина',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков',
+)
+SECOND_NAMES = (
+    'Александрович', 'Дмитриевич', 'Сергеевич', 'Иванович', 'Андреевич',
+    'Михайлович', 'Алексеевич', 'Николаевич',
+)
+WORDS = (
+    'помощь', 'город', 'парк', 'приют', 'дети', 'уборка', 'забота',
+    'животные', 'экология', 'праздник', 'спорт', 'культура', 'музей',
+    'библиотека', 'ветераны', 'донорство', 'лес', 'река', 'двор', 'школа',
+)
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань', 'Екатеринбург', 'Самара')
+SKILLS = (
+    'Коммуникабельность', 'Организаторские навыки', 'Первая помощь',
+    'Фотография', 'Вождение', 'Работа с детьми', 'Дизайн', 'Переводы',
+)
+CATEGORIES = (
+    ('Экология', 'ecology'),
+    ('Социальная помощь', 'social'),
+    ('Спорт и здоровье', 'sport'),
+    ('Культура и искусство', 'culture'),
+    ('Помощь животным', 'animals'),
+)
+TAGS = (
+    'новости', 'проекты', 'волонтерство', 'события', 'итоги', 'анонсы',
+    'благодарность', 'экология', 'спорт', 'культура',
+)
+
+# Доли этапов жизненного цикла одобренных проектов и статусов проверки.
+# Статус open недостижим для дат, проходящих validate_dates
+# (прием заявок всегда начинается раньше мероприятия).
+LIFECYCLE_WEIGHTS = {
+    Project.READY_FOR_FEEDBACK: 30,
+    Project.RECEPTION_OF_RESPONSES_CLOSED: 15,
+    Project.PROJECT_COMPLETED: 30,
+}
+STATUS_APPROVE_WEIGHTS = {
+    Project.APPROVED: 75,
+    Project.PENDING: 10,
+    Project.EDITING: 5,
+    Project.REJECTED: 5,
+    Project.CANCELED_BY_ORGANIZER: 5,
+}
+INCOMES_WEIGHTS = {
+    ProjectIncomes.APPLICATION_SUBMITTED: 50,
+    ProjectIncomes.ACCEPTED: 35,
+    ProjectIncomes.REJECTED: 15,
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic dataset that passes the model and API '
+        'validators: organizations, volunteers, projects in every '
+        'lifecycle state, incomes, participants, favorites and news'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizations', type=int, default=100)
+        parser.add_argument('--volunteers', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=1000)
+        parser.add_argument(
+            '--incomes',
+            type=int,
+            default=10,
+            help='Average incomes per approved project',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=3,
+            help='Average favorite projects per volunteer',
+        )
+        parser.add_argument('--news', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, default=None, help='Random seed'
+        )
+        parser.add_argument(
+            '--password',
+            default='Password1',
+            help='Password of all generated users',
+        )
+
+    def handle(self, *args, **options):
+        self.random = Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Метка запуска делает уникальными email и названия проектов
+        # при повторных запусках на той же базе
+        self.run = uuid4().hex[:6]
+        self.now = timezone.now().replace(microsecond=0)
+        self.password = make_password(options['password'])
+        started = perf_counter()
+        total = 0
+
+        self.cities = self.ensure_cities()
+        self.skills = self.ensure_skills()
+        self.categories = self.ensure_categories()
+        steps = (
+            ('organizations', self.create_organizations,
+             options['organizations']),
+            ('volunteers', self.create_volunteers, options['volunteers']),
+            ('projects', self.create_projects, options['projects']),
+            ('incomes', self.create_incomes, options['incomes']),
+            ('favorites', self.create_favorites, options['favorites']),
+            ('news', self.create_news, options['news']),
+        )
+        for name, step, count in steps:
+            start = perf_counter()
+            with transaction.atomic():
+                rows = step(count)
+            seconds = perf_counter() - start
+            total += rows
+            self.stdout.write(self.style.SUCCESS(
+                f'Seeded {name}: {rows} rows in {seconds:.2f} s '
+                f'({rows / seconds if seconds else 0:.0f} rows/s)'
+            ))
+        # bulk_create не отправляет сигналы,
+        # кеши и счетчики обновляются явно
+        Project.objects.refresh_participants_count()
+        for name in REFERENCE_MODELS:
+            bump_reference_version(name)
+        invalidate_platform_about()
+        seconds = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Finish seed: {total} rows in {seconds:.2f} s '
+            f'({total / seconds if seconds else 0:.0f} rows/s)'
+        ))
+
+    def bulk_create(self, model, objects):
+        """
+        Сохраняет объекты пачками и возвращает их id.
+        """
+        ids = []
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            ids.extend(obj.pk for obj in batch)
+        return ids
+
+    def bulk_create_links(self, model, objects):
+        """
+        Сохраняет объекты связей пачками и возвращает их количество.
+        """
+        count = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            count += len(batch)
+        return count
+
+    def ensure_cities(self):
+        if not City.objects.exists():
+            City.objects.bulk_create(City(name=name) for name in CITIES)
+        return list(City.objects.values_list('pk', flat=True))
+
+    def ensure_skills(self):
+        Skills.objects.bulk_create(
+            (Skills(name=name) for name in SKILLS), ignore_conflicts=True
+        )
+        return list(Skills.objects.values_list('pk', flat=True))
+
+    def ensure_categories(self):
+        Category.objects.bulk_create(
+            (
+                Category(name=name, slug=slug, description=name)
+                for name, slug in CATEGORIES
+            ),
+            ignore_conflicts=True,
+        )
+        return list(Category.objects.values_list('pk', flat=True))
+
+    def choice(self, weights):
+        return self.random.choices(
+            tuple(weights), weights=tuple(weights.values())
+        )[0]
+
+    def phone(self):
+        return f'+79{self.random.randrange(10 ** 9):09d}'
+
+    def text(self, words):
+        text = ' '.join(self.random.choices(WORDS, k=words))
+        return f'{text.capitalize()}.'
+
+    def create_users(self, count, role, prefix):
+        return self.bulk_create(User, (
+            User(
+                email=f'{prefix}{index}.{self.run}@example.com',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                second_name=self.random.choice(SECOND_NAMES),
+                role=role,
+                password=self.password,
+            )
+            for index in range(count)
+        ))
+
+    def create_organizations(self, count):
+        user_ids = self.create_users(count, User.ORGANIZER, 'organizer')
+        last_ogrn = Organization.objects.aggregate(last=Max('ogrn'))['last']
+        first_ogrn = int(last_ogrn or 10 ** 12) + 1
+        self.organizations = self.bulk_create(Organization, (
+            Organization(
+                contact_person_id=user_id,
+                title=f'Организация {self.random.choice(WORDS)} №{index}',
+                ogrn=f'{first_ogrn + index:013d}',
+                phone=self.phone(),
+                about=self.text(20),
+                city_id=self.random.choice(self.cities),
+            )
+            for index, user_id in enumerate(user_ids)
+        ))
+        return len(user_ids) + len(self.organizations)
+
+    def create_volunteers(self, count):
+        user_ids = self.create_users(count, User.VOLUNTEER, 'volunteer')
+        self.volunteer_users = dict(zip(
+            self.bulk_create(Volunteer, (
+                Volunteer(
+                    user_id=user_id,
+                    city_id=self.random.choice(self.cities),
+                    telegram=f'@volunteer_{user_id}',
+                    date_of_birth=date(1960, 1, 1) + timedelta(
+                        days=self.random.randrange(45 * 365)
+                    ),
+                    phone=self.phone(),
+                )
+                for user_id in user_ids
+            )),
+            user_ids,
+        ))
+        skills = self.bulk_create_links(VolunteerSkills, (
+            VolunteerSkills(volunteer_id=volunteer_id, skill_id=skill_id)
+            for volunteer_id in self.volunteer_users
+            for skill_id in self.random.sample(
+                self.skills, min(3, len(self.skills))
+            )
+        ))
+        return 2 * len(user_ids) + skills
+
+    def project_dates(self, lifecycle):
+        """
+        Даты проекта, дающие нужный этап жизненного цикла относительно
+        текущего времени.
+
+        Соотношения дат проходят validate_dates на момент создания
+        проекта: прием заявок 7-21 день, мероприятие после него,
+        с 8 до 22 часов, длительностью 2-9 часов.
+        """
+        application_days = self.random.randint(7, 21)
+        if lifecycle == Project.READY_FOR_FEEDBACK:
+            start_application = self.now - timedelta(
+                days=self.random.randint(0, application_days - 1)
+            )
+        elif lifecycle == Project.RECEPTION_OF_RESPONSES_CLOSED:
+            start_application = self.now - timedelta(
+                days=application_days + 1
+            )
+        else:
+            start_application = self.now - timedelta(
+                days=application_days + self.random.randint(10, 365)
+            )
+        end_application = start_application + timedelta(
+            days=application_days
+        )
+        # Незавершенные мероприятия начинаются не раньше завтрашнего дня
+        first_day = end_application if (
+            lifecycle == Project.PROJECT_COMPLETED
+        ) else max(end_application, self.now)
+        start_day = first_day.date() + timedelta(
+            days=self.random.randint(1, 7)
+        )
+        start = datetime.combine(
+            start_day, time(hour=self.random.randint(8, 13))
+        )
+        if timezone.is_aware(self.now):
+            start = timezone.make_aware(start)
+        end = start + timedelta(hours=self.random.randint(2, 9))
+        return start_application, end_application, start, end
+
+    def create_projects(self, count):
+        addresses = self.bulk_create(Address, (
+            Address(
+                address_line=f'ул. Ленина, д. {index % 200 + 1}',
+                street='Ленина',
+                house=str(index % 200 + 1),
+            )
+            for index in range(count)
+        ))
+        self.project_ids, self.projects = [], {}
+        projects = []
+        for index, address_id in enumerate(addresses):
+            status_approve = self.choice(STATUS_APPROVE_WEIGHTS)
+            lifecycle = self.choice(LIFECYCLE_WEIGHTS)
+            start_application, end_application, start, end = (
+                self.project_dates(lifecycle)
+            )
+            projects.append(Project(
+                name=(
+                    f'{self.random.choice(WORDS).capitalize()} '
+                    f'{self.run} №{index}'
+                ),
+                description=self.text(30),
+                picture='projects/seed.png',
+                start_datetime=start,
+                end_datetime=end,
+                start_date_application=start_application,
+                end_date_application=end_application,
+                event_purpose=self.text(15),
+                event_address_id=address_id,
+                project_tasks=self.text(10),
+                project_events=self.text(10),
+                organizer_provides=self.text(10),
+                organization_id=self.random.choice(self.organizations),
+                city_id=self.random.choice(self.cities),
+                max_participants=self.random.choice((None, 10, 50, 100)),
+                status_approve=status_approve,
+            ))
+            if len(projects) == self.batch_size:
+                self.save_projects(projects)
+                projects = []
+        self.save_projects(projects)
+        links = self.bulk_create_links(ProjectSkills, (
+            ProjectSkills(project_id=project_id, skill_id=skill_id)
+            for project_id in self.project_ids
+            for skill_id in self.random.sample(
+                self.skills, min(2, len(self.skills))
+            )
+        ))
+        links += self.bulk_create_links(Project.categories.through, (
+            Project.categories.through(
+                project_id=project_id, category_id=category_id
+            )
+            for project_id in self.project_ids
+            for category_id in self.random.sample(
+                self.categories, min(2, len(self.categories))
+            )
+        ))
+        return 2 * len(addresses) + links
+
+    def save_projects(self, projects):
+        Project.objects.bulk_create(projects)
+        self.project_ids.extend(project.pk for project in projects)
+        # Для заявок нужны только одобренные проекты и их лимиты
+        self.projects.update(
+            (project.pk, project.max_participants) for project in projects
+            if project.status_approve == Project.APPROVED
+        )
+
+    def generate_incomes(self, average, participants):
+        volunteers = list(self.volunteer_users)
+        for project_id, max_participants in self.projects.items():
+            size = min(
+                len(volunteers), self.random.randint(0, 2 * average)
+            )
+            accepted = 0
+            for volunteer_id in self.random.sample(volunteers, size):
+                status = self.choice(INCOMES_WEIGHTS)
+                if status == ProjectIncomes.ACCEPTED:
+                    if (
+                        max_participants is not None
+                        and accepted >= max_participants
+                    ):
+                        status = ProjectIncomes.REJECTED
+                    else:
+                        accepted += 1
+                        participants.append((project_id, volunteer_id))
+                yield ProjectIncomes(
+                    project_id=project_id,
+                    volunteer_id=volunteer_id,
+                    status_incomes=status,
+                    cover_letter=self.text(5),
+                )
+
+    def create_incomes(self, average):
+        participants = []
+        incomes = self.bulk_create_links(
+            ProjectIncomes, self.generate_incomes(average, participants)
+        )
+        participant_ids = self.bulk_create(ProjectParticipants, (
+            ProjectParticipants(
+                project_id=project_id, volunteer_id=volunteer_id
+            )
+            for project_id, volunteer_id in participants
+        ))
+        # Участников проекта отдает связь Project.participants,
+        # ее заполняет и принятие заявки
+        links = self.bulk_create_links(Project.participants.through, (
+            Project.participants.through(
+                project_id=project_id, projectparticipants_id=participant_id
+            )
+            for (project_id, _), participant_id in zip(
+                participants, participant_ids
+            )
+        ))
+        return incomes + len(participant_ids) + links
+
+    def create_favorites(self, average):
+        projects = list(self.projects)
+        return self.bulk_create_links(ProjectFavorite, (
+            ProjectFavorite(user_id=user_id, project_id=project_id)
+            for user_id in self.volunteer_users.values()
+            for project_id in self.random.sample(
+                projects,
+                min(len(projects), self.random.randint(0, 2 * average)),
+            )
+        ))
+
+    def create_news(self, count):
+        Tag.objects.bulk_create(
+            (Tag(name=name, slug=slugify(name, allow_unicode=True))
+             for name in TAGS),
+            ignore_conflicts=True,
+        )
+        tags = list(
+            Tag.objects.filter(name__in=TAGS).values_list('pk', flat=True)
+        )
+        authors = list(
+            User.objects.filter(is_staff=True).values_list('pk', flat=True)
+        ) or self.random.sample(
+            list(self.volunteer_users.values()),
+            min(10, len(self.volunteer_users)),
+        )
+        news = self.bulk_create(News, (
+            News(
+                title=self.text(5),
+                text=self.text(60),
+                author_id=self.random.choice(authors),
+            )
+            for _ in range(count)
+        ))
+        content_type = ContentType.objects.get_for_model(News)
+        tagged = self.bulk_create_links(TaggedItem, (
+            TaggedItem(
+                tag_id=tag_id,
+                content_type=content_type,
+                object_id=news_id,
+            )
+            for news_id in news
+            for tag_id in self.random.sample(tags, min(3, len(tags)))
+        ))
+        return len(news) + tagged
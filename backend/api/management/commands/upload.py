@@ -1,8 +1,15 @@
 import os
-from csv import DictReader
+from collections import Counter
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
+from api.cache import (
+    REFERENCE_MODELS,
+    bump_reference_version,
+    invalidate_platform_about,
+)
+from api.loaders import CsvLoader
 from content.models import City, News, Skills, Valuation
 from projects.models import (
     Address,
@@ -17,6 +24,7 @@ from projects.models import (
 )
 from users.models import User
 
+# Порядок загрузки определяется по внешним ключам моделей
 TABLES_DICT = {
     Address: 'address.csv',
     City: 'cities.csv',
@@ -34,25 +42,114 @@ TABLES_DICT = {
     ProjectParticipants: 'projectparticipants.csv'
 }
 
+# Естественные ключи для --upsert, модели без ключа сопоставляются
+# по всем колонкам csv
+NATURAL_KEYS = {
+    City: ('name',),
+    Skills: ('name',),
+    Category: ('slug',),
+    Valuation: ('title',),
+    User: ('email',),
+    Organization: ('ogrn',),
+    Volunteer: ('user',),
+    VolunteerSkills: ('volunteer', 'skill'),
+    Project: ('name',),
+    ProjectCategories: ('project', 'category'),
+    ProjectSkills: ('project', 'skill'),
+    ProjectParticipants: ('project', 'volunteer'),
+}
+
 
 class Command(BaseCommand):
     help = 'Load data from csv files'
 
-    def handle(self, *args, **kwargs):
-        for model, base in TABLES_DICT.items():
-            try:
-                file_path = os.path.join(os.getcwd(), 'data', f'{base}')
-                with open(file_path, encoding="utf-8-sig") as csv_file:
-                    reader = DictReader(csv_file)
-                    model.objects.bulk_create(model(**data) for data in reader)
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Successfully load table '
-                            f'of model {model.__name__}'
-                        )
-                    )
-            except Exception as error:
-                self.stdout.write(
-                    self.style.ERROR(f'{error} for model {model.__name__}')
-                )
-        self.stdout.write(self.style.SUCCESS('Finish load data'))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join(os.getcwd(), 'data'),
+            help='Directory with csv files',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows read and written per batch',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Write batches with COPY FROM STDIN (PostgreSQL only)',
+        )
+        parser.add_argument(
+            '--atomic',
+            choices=('table', 'global'),
+            default='table',
+            help='One transaction per table or one for the whole load',
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Insert new rows and update changed ones by natural key',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be created and updated',
+        )
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL')
+        if options['copy'] and options['upsert']:
+            raise CommandError('--copy cannot be combined with --upsert')
+        loader = CsvLoader(
+            TABLES_DICT,
+            options['data_dir'],
+            batch_size=options['batch_size'],
+            use_copy=options['copy'],
+            atomic=options['atomic'],
+            upsert=options['upsert'],
+            natural_keys=NATURAL_KEYS,
+            dry_run=options['dry_run'],
+        )
+        total, total_seconds = Counter(), 0
+        try:
+            for model, stats, seconds in loader.load():
+                total.update(stats)
+                total_seconds += seconds
+                self.stdout.write(self.style.SUCCESS(
+                    f'{self.get_prefix(options)} table of model '
+                    f'{model.__name__}: {self.format_stats(stats, seconds)}'
+                ))
+        except Exception as error:
+            raise CommandError(
+                f'{error} for model {loader.current_model.__name__}'
+            ) from error
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'Dry run, nothing saved: '
+                f'{self.format_stats(total, total_seconds)}'
+            ))
+            return
+        # bulk_create и COPY не отправляют сигналы,
+        # кеши и счетчики обновляются явно
+        Project.objects.refresh_participants_count()
+        for name in REFERENCE_MODELS:
+            bump_reference_version(name)
+        invalidate_platform_about()
+        self.stdout.write(self.style.SUCCESS(
+            f'Finish load data: {self.format_stats(total, total_seconds)}'
+        ))
+
+    def get_prefix(self, options):
+        return 'Checked' if options['dry_run'] else 'Successfully load'
+
+    def format_stats(self, stats, seconds):
+        rate = stats['rows'] / seconds if seconds else 0
+        return (
+            f'{stats["rows"]} rows (created {stats["created"]}, '
+            f'updated {stats["updated"]}, '
+            f'unchanged {stats["unchanged"]}, '
+            f'duplicates {stats["duplicates"]}) '
+            f'in {seconds:.2f} s ({rate:.0f} rows/s)'
+        )
@@ -0,0 +1,290 @@
+import logging
+import random
+import re
+import threading
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from backend.metrics import observe_request
+
+from .profiling import (
+    get_profile,
+    save_profile,
+    start_profile,
+    stop_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Остальные методы попадают в метрики как OTHER, чтобы не плодить метки
+METRICS_METHODS = {
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'
+}
+
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+\b'), '?'),
+    (re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)'), '(...)'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Представление выполнило больше SQL запросов, чем разрешено.
+    """
+
+
+def fingerprint(sql):
+    """
+    Приводит SQL к виду без значений параметров, чтобы одинаковые
+    запросы с разными аргументами (признак N+1) группировались.
+    """
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def get_query_budget(view_func, method):
+    """
+    Бюджет SQL запросов для представления и метода запроса.
+
+    Берется из атрибута query_budget класса представления: число для
+    всех действий или словарь по действию viewset ('list', 'retrieve',
+    имя @action) либо по методу HTTP для обычных APIView.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if not isinstance(budget, dict):
+        return budget
+    action = getattr(view_func, 'actions', None) or {}
+    return budget.get(action.get(method), budget.get(method))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((context['connection'].alias, sql))
+        return execute(sql, params, many, context)
+
+    def discard(self, alias):
+        self.queries = [query for query in self.queries if query[0] != alias]
+
+
+def discard_connection_setup(sender, connection, **kwargs):
+    """
+    Не учитывает запросы, выполненные при открытии соединения
+    (например, поиск oid типов django.contrib.postgres): они не зависят
+    от представления.
+    """
+    for counter in getattr(_local, 'counters', ()):
+        counter.discard(connection.alias)
+
+
+connection_created.connect(discard_connection_setup)
+
+
+@contextmanager
+def count_queries():
+    """
+    Считает SQL запросы по всем соединениям, выполненные внутри блока.
+    """
+    counter = QueryCounter()
+    counters = _local.__dict__.setdefault('counters', [])
+    counters.append(counter)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            yield counter
+    finally:
+        counters.remove(counter)
+
+
+class QueryBudgetMiddleware:
+    """
+    Проверяет, что представление уложилось в свой бюджет SQL запросов.
+
+    Режим задается настройкой QUERY_BUDGET_MODE: 'raise' - исключение
+    QueryBudgetExceeded (тесты, staging), 'log' - предупреждение
+    с отпечатками самых частых запросов для доли
+    QUERY_BUDGET_SAMPLE_RATE превышений (production), 'off' - проверка
+    отключена. Представления без query_budget не проверяются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.QUERY_BUDGET_MODE == 'off':
+            return self.get_response(request)
+        request.query_budget = None
+        with count_queries() as counter:
+            response = self.get_response(request)
+        budget = request.query_budget
+        queries = [sql for _, sql in counter.queries]
+        if budget is not None and len(queries) > budget:
+            self.exceeded(request, budget, queries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'query_budget'):
+            request.query_budget = get_query_budget(
+                view_func, request.method.lower()
+            )
+
+    def exceeded(self, request, budget, queries):
+        fingerprints = Counter(fingerprint(sql) for sql in queries)
+        message = (
+            f'{request.method} {request.path}: {len(queries)} SQL queries, '
+            f'budget {budget}'
+        )
+        if settings.QUERY_BUDGET_MODE == 'raise':
+            top = '\n'.join(
+                f'{count} x {sql}'
+                for sql, count in fingerprints.most_common(5)
+            )
+            raise QueryBudgetExceeded(f'{message}\n{top}')
+        if random.random() < settings.QUERY_BUDGET_SAMPLE_RATE:
+            logger.warning(
+                '%s. Most frequent: %s',
+                message,
+                '; '.join(
+                    f'{count} x {sql}'
+                    for sql, count in fingerprints.most_common(5)
+                ),
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Легковесное профилирование запросов.
+
+    Для каждого запроса считает общее время, время и количество SQL
+    запросов, повторяющиеся запросы, время сериализации и рендеринга,
+    попадания в кеш. Администраторам (is_staff) они отдаются в заголовке
+    Server-Timing, остальным клиентам не видны. Доля
+    PROFILING_SAMPLE_RATE запросов сохраняется в кольцевой буфер, который
+    доступен администраторам по адресу /api/profiling/. Включается
+    настройкой PROFILING_ENABLED, по умолчанию выключено.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        profile = start_profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            stop_profile()
+        total = perf_counter() - profile.started
+        duplicates = profile.duplicates(fingerprint)
+        # Пользователя, вошедшего по токену, DRF сохраняет и в request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = self.get_server_timing(
+                profile, total, duplicates
+            )
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            save_profile(self.get_entry(
+                request, response, profile, total, duplicates
+            ))
+        return response
+
+    def process_template_response(self, request, response):
+        profile = get_profile()
+        if profile is not None:
+            start = perf_counter()
+
+            def rendered(response):
+                profile.sections['render'] += perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def get_server_timing(self, profile, total, duplicates):
+        metrics = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={profile.db_seconds * 1000:.1f};'
+            f'desc="{len(profile.queries)} queries, '
+            f'{sum(item["count"] - 1 for item in duplicates)} repeated"',
+        ]
+        metrics.extend(
+            f'{name};dur={seconds * 1000:.1f}'
+            for name, seconds in profile.sections.items()
+        )
+        metrics.append(
+            f'cache;desc="{profile.cache_hits} hits, '
+            f'{profile.cache_misses} misses"'
+        )
+        return ', '.join(metrics)
+
+    def get_entry(self, request, response, profile, total, duplicates):
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(profile.db_seconds * 1000, 2),
+            'queries': len(profile.queries),
+            'duplicates': duplicates[:5],
+            'serializer_ms': round(
+                profile.sections['serializer'] * 1000, 2
+            ),
+            'render_ms': round(profile.sections['render'] * 1000, 2),
+            'cache_hits': profile.cache_hits,
+            'cache_misses': profile.cache_misses,
+        }
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики Prometheus по запросам: время обработки, число SQL
+    запросов и статусы ответов по представлениям и действиям viewset.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        seconds = perf_counter() - start
+        method = request.method
+        if method not in METRICS_METHODS:
+            method = 'OTHER'
+        match = request.resolver_match
+        if match is None:
+            view = action = 'unmatched'
+        else:
+            view = match.view_name
+            actions = getattr(match.func, 'actions', None) or {}
+            action = actions.get(method.lower(), method)
+        observe_request(
+            method,
+            view,
+            action,
+            response.status_code,
+            seconds,
+            len(counter.queries),
+        )
+        return response
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.validators import ValidationError
 
 from projects.models import Organization, Volunteer
 
+from .cache import get_reference_data
+from .profiling import get_profile, get_timed_serializer_class
 from .utils import get_modify_validation_errors
 
 
@@ -24,6 +28,25 @@ class DestroyUserMixin:
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ProfiledSerializerMixin:
+    """
+    Миксин представления, учитывающий время сериализации ответа
+    в профиле запроса (см. api.middleware.ProfilingMiddleware).
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        # При генерации схемы drf_yasg подмена класса дала бы две
+        # разные схемы с одинаковым именем
+        if get_profile() is not None and not getattr(
+            self, 'swagger_fake_view', False
+        ):
+            serializer.__class__ = get_timed_serializer_class(
+                serializer.__class__
+            )
+        return serializer
+
+
 class IsValidModifyErrorForFrontendMixin:
     """
     Миксин для перехвата ошибок валидации и модификации их деталей.
@@ -42,3 +65,32 @@ class IsValidModifyErrorForFrontendMixin:
                 {},
             )
         return not bool(self._errors)
+
+
+class CachedReferenceListMixin:
+    """
+    Миксин для отдачи справочника списком из версионированного кеша.
+
+    Ответ содержит ETag с версией справочника и заголовок Cache-Control,
+    при совпадении If-None-Match возвращается 304. Запросы с параметрами
+    фильтрации выполняются в БД.
+    """
+
+    reference_name = None
+    query_budget = {'list': 2}
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        version, data = get_reference_data(
+            self.reference_name, self.get_serializer_class()
+        )
+        etag = f'"{self.reference_name}-{version}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=settings.REFERENCE_CACHE_MAX_AGE
+        )
+        return response
@@ -0,0 +1,37 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class CursorOptInPagination(LimitOffsetPagination):
+    """
+    Пагинация limit/offset с возможностью перейти на курсорную.
+
+    Курсорный режим включается параметром cursor, для первой страницы
+    он передается пустым: /projects/?cursor=
+    Страницы выбираются по позиции в порядке сортировки представления
+    (атрибут cursor_ordering) без OFFSET и без запроса COUNT(*),
+    поэтому время ответа не зависит от глубины листания.
+    """
+
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = CursorPagination()
+        self.cursor_paginator.ordering = view.cursor_ordering
+        self.cursor_paginator.page_size = self.default_limit
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_fields(self, view):
+        return (
+            super().get_schema_fields(view)
+            + CursorPagination().get_schema_fields(view)
+        )
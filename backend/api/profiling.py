@@ -0,0 +1,190 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from time import perf_counter, time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend.metrics import CACHE_REQUESTS
+
+PROFILES_INDEX_CACHE_KEY = 'profiling:index'
+PROFILES_CACHE_KEY = 'profiling:{}'
+
+_local = threading.local()
+
+
+class Profile:
+    """
+    Показатели обработки одного запроса.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = []
+        self.sections = defaultdict(float)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, perf_counter() - start))
+
+    @property
+    def db_seconds(self):
+        return sum(seconds for _, seconds in self.queries)
+
+    def duplicates(self, fingerprint):
+        """
+        Отпечатки запросов, выполненных больше одного раза, самые частые
+        первыми.
+        """
+        counter = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in counter.most_common()
+            if count > 1
+        ]
+
+
+def get_profile():
+    return getattr(_local, 'profile', None)
+
+
+def start_profile():
+    _local.profile = Profile()
+    return _local.profile
+
+
+def stop_profile():
+    _local.profile = None
+
+
+@contextmanager
+def profile_section(name):
+    """
+    Добавляет время выполнения блока к разделу профиля текущего запроса.
+    Вложенные блоки с тем же именем не учитываются повторно.
+    """
+    profile = get_profile()
+    if profile is None or name in getattr(_local, 'sections', ()):
+        yield
+        return
+    _local.sections = getattr(_local, 'sections', set()) | {name}
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        profile.sections[name] += perf_counter() - start
+        _local.sections = _local.sections - {name}
+
+
+def count_cache(name, hit):
+    """
+    Учитывает обращение к кешу name в метриках и профиле запроса.
+    """
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+    profile = get_profile()
+    if profile is None:
+        return
+    if hit:
+        profile.cache_hits += 1
+    else:
+        profile.cache_misses += 1
+
+
+class TimedDataMixin:
+    """
+    Учитывает сериализацию (обращение к data) в профиле запроса.
+    """
+
+    @property
+    def data(self):
+        with profile_section('serializer'):
+            return super().data
+
+
+@lru_cache(maxsize=None)
+def get_timed_serializer_class(serializer_class):
+    return type(
+        serializer_class.__name__,
+        (TimedDataMixin, serializer_class),
+        {'__module__': serializer_class.__module__},
+    )
+
+
+def save_profile(entry):
+    """
+    Сохраняет запись в кольцевой буфер из PROFILING_BUFFER_SIZE ячеек
+    в общем кеше, чтобы записи всех процессов были в одном месте.
+    """
+    cache.add(PROFILES_INDEX_CACHE_KEY, 0, None)
+    index = cache.incr(PROFILES_INDEX_CACHE_KEY)
+    cache.set(
+        PROFILES_CACHE_KEY.format(index % settings.PROFILING_BUFFER_SIZE),
+        {'id': index, 'timestamp': time(), **entry},
+        settings.PROFILING_BUFFER_TIMEOUT,
+    )
+
+
+def load_profiles():
+    """
+    Записи кольцевого буфера, начиная с самых новых.
+    """
+    keys = [
+        PROFILES_CACHE_KEY.format(slot)
+        for slot in range(settings.PROFILING_BUFFER_SIZE)
+    ]
+    return sorted(
+        cache.get_many(keys).values(),
+        key=lambda entry: entry['id'],
+        reverse=True,
+    )
+
+
+def percentile(values, percent):
+    """
+    Перцентиль по методу ближайшего ранга, values отсортированы.
+    Для пустого списка возвращает None.
+    """
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize_profiles(entries):
+    """
+    Сводка по эндпоинтам, самые затратные по суммарному времени первыми.
+    """
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[(entry['method'], entry['view'])].append(entry)
+    summary = []
+    for (method, view), group in groups.items():
+        total = sorted(entry['total_ms'] for entry in group)
+        summary.append({
+            'method': method,
+            'view': view,
+            'requests': len(group),
+            'total_ms': round(sum(total), 2),
+            'p50_ms': percentile(total, 50),
+            'p95_ms': percentile(total, 95),
+            'max_ms': total[-1],
+            'db_ms': round(
+                sum(entry['db_ms'] for entry in group) / len(group), 2
+            ),
+            'queries': round(
+                sum(entry['queries'] for entry in group) / len(group), 2
+            ),
+            'serializer_ms': round(
+                sum(entry['serializer_ms'] for entry in group) / len(group),
+                2,
+            ),
+        })
+    return sorted(summary, key=lambda row: row['total_ms'], reverse=True)
@@ -36,7 +36,19 @@ status_project_filter_params = [
 ]
 
 project_incomes_filter_params = openapi.Parameter(
-        'project_id', openapi.IN_QUERY, type=openapi.TYPE_STRING,
-        description=('Фильтрует заявки по id проекта. '
-                     'Пример запроса /api/incomes/?project_id=1')
-    )
+    'project_id', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description=('Фильтрует заявки по id проекта. '
+                 'Пример запроса /api/incomes/?project_id=1')
+)
+
+incomes_expand_params = openapi.Parameter(
+    'expand', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description=('Возвращает полные данные проекта вместо краткой '
+                 'карточки. Пример запроса /api/incomes/?expand=project')
+)
+
+suggest_params = openapi.Parameter(
+    'q', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description=('Строка для автодополнения, не короче 2 символов. '
+                 'Пример запроса /api/suggest/?q=моск')
+)
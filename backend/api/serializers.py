@@ -1,8 +1,10 @@
 import re
+from collections import Counter
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
@@ -10,7 +12,13 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from taggit.models import Tag
 
-from api.utils import NonEmptyBase64ImageField, create_user, get_site_data
+from api.utils import (
+    CachedPrimaryKeyRelatedField,
+    ImageVariantsField,
+    NonEmptyBase64ImageField,
+    create_user,
+    get_site_data,
+)
 from content.models import (
     City,
     Feedback,
@@ -19,10 +27,8 @@ from content.models import (
     Skills,
     Valuation,
 )
-from notifications.tasks import (
-    incomes_approve_send_email,
-    incomes_reject_send_email,
-)
+from notifications.models import Notification
+from notifications.tasks import enqueue_notifications
 from projects.models import (
     Address,
     Category,
@@ -37,7 +43,11 @@ from projects.models import (
 )
 
 from .mixins import IsValidModifyErrorForFrontendMixin
-from .validators import validate_dates, validate_status_incomes
+from .validators import (
+    validate_dates,
+    validate_max_participants,
+    validate_status_incomes,
+)
 
 User = get_user_model()
 
@@ -109,10 +119,19 @@ class NewsSerializer(serializers.ModelSerializer):
 
     tags = TagListSerializerField()
     author = serializers.SerializerMethodField()
+    picture_srcset = ImageVariantsField('picture')
 
     class Meta:
         model = News
-        fields = ('picture', 'tags', 'title', 'text', 'author', 'created_at')
+        fields = (
+            'picture',
+            'picture_srcset',
+            'tags',
+            'title',
+            'text',
+            'author',
+            'created_at',
+        )
 
     def get_author(self, obj):
         return f'{obj.author.first_name} {obj.author.last_name}'
@@ -124,10 +143,11 @@ class PreviewNewsSerializer(serializers.ModelSerializer):
     """
 
     tags = TagListSerializerField()
+    picture_srcset = ImageVariantsField('picture')
 
     class Meta:
         model = News
-        fields = ('picture', 'title', 'tags', 'created_at')
+        fields = ('picture', 'picture_srcset', 'title', 'tags', 'created_at')
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
@@ -171,9 +191,11 @@ class SkillsSerializer(serializers.ModelSerializer):
 
 
 class ProjectImageSerializer(serializers.ModelSerializer):
+    photo_srcset = ImageVariantsField('photo')
+
     class Meta:
         model = ProjectImage
-        fields = ('id', 'project', 'photo')
+        fields = ('id', 'project', 'photo', 'photo_srcset')
 
 
 class VolunteerGetSerializer(serializers.ModelSerializer):
@@ -183,6 +205,7 @@ class VolunteerGetSerializer(serializers.ModelSerializer):
 
     user = UserSerializer(read_only=True)
     skills = SkillsSerializer(many=True)
+    photo_srcset = ImageVariantsField('photo')
 
     class Meta:
         model = Volunteer
@@ -193,6 +216,7 @@ class VolunteerGetSerializer(serializers.ModelSerializer):
             'telegram',
             'skills',
             'photo',
+            'photo_srcset',
             'date_of_birth',
             'phone',
         )
@@ -224,8 +248,11 @@ class ProjectGetSerializer(serializers.ModelSerializer):
     city = serializers.SlugRelatedField(slug_field='name', read_only=True)
     photos = ProjectImageSerializer(many=True, read_only=True)
     participants = serializers.SerializerMethodField()
+    picture_srcset = ImageVariantsField('picture')
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return ProjectFavorite.objects.filter(
@@ -235,6 +262,8 @@ class ProjectGetSerializer(serializers.ModelSerializer):
         return False
 
     def get_status(self, data):
+        if hasattr(data, 'status'):
+            return data.status
         OPEN = 'open'
         READY = 'ready_for_feedback'
         CLOSED = 'reception_of_responses_closed'
@@ -259,21 +288,17 @@ class ProjectGetSerializer(serializers.ModelSerializer):
         return EDITING
 
     def get_participants(self, obj):
-        participants_data = ProjectParticipantSerializer(
-            obj.participants.all(), many=True
-        ).data
-        return [
-            {
-                'id': participant.get('id'),
-                'volunteer_id': participant['volunteer']['id'],
+        participants = []
+        for participant in obj.participants.all():
+            user = participant.volunteer.user
+            participants.append({
+                'id': participant.id,
+                'volunteer_id': participant.volunteer_id,
                 'full_name': (
-                    f'{participant["volunteer"]["user"]["last_name"]} '
-                    f'{participant["volunteer"]["user"]["first_name"]} '
-                    f'{participant["volunteer"]["user"]["second_name"]}'
-                )
-            }
-            for participant in participants_data
-        ]
+                    f'{user.last_name} {user.first_name} {user.second_name}'
+                ),
+            })
+        return participants
 
     class Meta:
         model = Project
@@ -283,6 +308,7 @@ class ProjectGetSerializer(serializers.ModelSerializer):
             'name',
             'description',
             'picture',
+            'picture_srcset',
             'start_datetime',
             'end_datetime',
             'start_date_application',
@@ -301,7 +327,9 @@ class ProjectGetSerializer(serializers.ModelSerializer):
             'skills',
             'is_favorited',
             'status',
-            'photos'
+            'photos',
+            'max_participants',
+            'participants_count',
         )
         read_only_fields = fields
 
@@ -311,12 +339,17 @@ class DraftProjectSerializer(serializers.ModelSerializer):
     Сериализатор для создания/редоктирования черновика - проекта.
     """
 
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     event_address = AddressSerializer(required=False, allow_null=True)
-    skills = serializers.PrimaryKeyRelatedField(
+    skills = CachedPrimaryKeyRelatedField(
         required=False, queryset=Skills.objects.all(), many=True
     )
     picture = Base64ImageField(required=False, allow_null=True)
 
+    def validate_max_participants(self, value):
+        return validate_max_participants(self.instance, value)
+
     def validate_status_approve(self, value):
         if value != Project.EDITING:
             raise serializers.ValidationError(
@@ -375,6 +408,7 @@ class DraftProjectSerializer(serializers.ModelSerializer):
             'categories',
             'status_approve',
             'skills',
+            'max_participants',
         )
         read_only_fields = ('organization',)
         extra_kwargs = {
@@ -390,12 +424,13 @@ class ProjectSerializer(serializers.ModelSerializer):
     Сериализатор для создания/редактирования проекта.
     """
 
+    serializer_related_field = CachedPrimaryKeyRelatedField
     event_address = AddressSerializer()
-    skills = serializers.PrimaryKeyRelatedField(
+    skills = CachedPrimaryKeyRelatedField(
         queryset=Skills.objects.all(), many=True, allow_null=False
     )
     picture = NonEmptyBase64ImageField()
-    city = serializers.PrimaryKeyRelatedField(
+    city = CachedPrimaryKeyRelatedField(
         queryset=City.objects.all(),
         required=True,
         allow_null=False,  # Запретить отправку значения None. если удасться
@@ -423,6 +458,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             'categories',
             'status_approve',
             'skills',
+            'max_participants',
         )
         read_only_fields = ('organization',)
         extra_kwargs = {field: {'required': True} for field in fields}
@@ -440,6 +476,9 @@ class ProjectSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Выберите хоть один навык.")
         return value
 
+    def validate_max_participants(self, value):
+        return validate_max_participants(self.instance, value)
+
     def validate(self, data):
         try:
             start_datetime = data['start_datetime']
@@ -582,10 +621,11 @@ class VolunteerCreateSerializer(
     """
 
     user = UserCreateSerializer()
-    skills = serializers.PrimaryKeyRelatedField(
+    skills = CachedPrimaryKeyRelatedField(
         queryset=Skills.objects.all(), many=True
     )
     photo = Base64ImageField(required=False)
+    photo_srcset = ImageVariantsField('photo')
 
     def create_skills(self, skills, volunteer):
         data = []
@@ -608,7 +648,7 @@ class VolunteerCreateSerializer(
 
     class Meta:
         model = Volunteer
-        fields = '__all__'
+        exclude = ('photo_variants',)
 
 
 class VolunteerUpdateSerializer(VolunteerCreateSerializer):
@@ -665,6 +705,56 @@ class ProjectIncomesGetSerializer(serializers.ModelSerializer):
         )
 
 
+class PreviewProjectSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для краткого отображения проекта в заявке.
+    """
+
+    class Meta:
+        model = Project
+        fields = ('id', 'name')
+
+
+class PreviewVolunteerSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для карточки волонтера в заявке.
+    """
+
+    full_name = serializers.SerializerMethodField()
+    skills = SkillsSerializer(many=True)
+    photo_srcset = ImageVariantsField('photo')
+
+    class Meta:
+        model = Volunteer
+        fields = ('id', 'full_name', 'photo', 'photo_srcset', 'city', 'skills')
+
+    def get_full_name(self, obj):
+        user = obj.user
+        return f'{user.last_name} {user.first_name} {user.second_name}'
+
+
+class PreviewProjectIncomesSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для просмотра заявок волонтеров списком.
+    """
+
+    volunteer = PreviewVolunteerSerializer(read_only=True)
+    project = PreviewProjectSerializer(read_only=True)
+
+    class Meta:
+        model = ProjectIncomes
+        fields = (
+            'id',
+            'project',
+            'volunteer',
+            'status_incomes',
+            'created_at',
+            'phone',
+            'telegram',
+            'cover_letter',
+        )
+
+
 class ProjectIncomesSerializer(serializers.ModelSerializer):
     """
     Сериализатор для заявок волонтеров.
@@ -736,22 +826,32 @@ class ProjectIncomesSerializer(serializers.ModelSerializer):
         """
         Принимает заявку волонтера и добавляет его в участники проекта.
         """
-        existing_participant = ProjectParticipants.objects.filter(
-            project=instance.project, volunteer=instance.volunteer
-        ).first()
-        if existing_participant:
-            raise serializers.ValidationError(
-                'Этот волонтер уже является участником проекта.'
+        with transaction.atomic():
+            # Блокирует проект до конца транзакции, поэтому проверка
+            # участника ниже не гонится с параллельным принятием
+            if not Project.objects.take_places(instance.project_id):
+                raise serializers.ValidationError(
+                    'В проекте не осталось свободных мест.'
+                )
+            existing_participant = ProjectParticipants.objects.filter(
+                project=instance.project, volunteer=instance.volunteer
+            ).first()
+            if existing_participant:
+                raise serializers.ValidationError(
+                    'Этот волонтер уже является участником проекта.'
+                )
+            instance.status_incomes = ProjectIncomes.ACCEPTED
+            instance.save()
+            participiants = ProjectParticipants.objects.create(
+                project=instance.project, volunteer=instance.volunteer
             )
-        instance.status_incomes = ProjectIncomes.ACCEPTED
-        instance.save()
-        participiants = ProjectParticipants.objects.create(
-            project=instance.project, volunteer=instance.volunteer
-        )
-        instance.project.participants.add(participiants)   # добавила
-        incomes_approve_send_email.delay(
-            participiants.pk, get_site_data(self.context.get('request', {}))
-        )
+            instance.project.participants.add(participiants)   # добавила
+            enqueue_notifications([Notification(
+                kind=Notification.INCOMES_APPROVE,
+                user_id=instance.volunteer.user_id,
+                project_id=instance.project_id,
+                context=get_site_data(self.context.get('request', {})),
+            )])
         return {
             'message': 'Заявка волонтера принята и добавлена в '
             'участники проекта.'
@@ -763,33 +863,209 @@ class ProjectIncomesSerializer(serializers.ModelSerializer):
         """
         if instance.status_incomes == ProjectIncomes.REJECTED:
             raise serializers.ValidationError('Вы уже отклоняли данную заявку')
-        elif instance.status_incomes == ProjectIncomes.ACCEPTED:
-            existing_participant = ProjectParticipants.objects.get(
-                project=instance.project, volunteer=instance.volunteer
-            )
-            incomes_reject_send_email.delay(
-                existing_participant.pk,
-                get_site_data(self.context.get('request', {}))
-            )
-            existing_participant.delete()
-        instance.status_incomes = ProjectIncomes.REJECTED
-        instance.save()
+        with transaction.atomic():
+            if instance.status_incomes == ProjectIncomes.ACCEPTED:
+                # Проект блокируется раньше участника, см. Project.lock
+                list(Project.objects.lock([instance.project_id]))
+                ProjectParticipants.objects.filter(
+                    project=instance.project, volunteer=instance.volunteer
+                ).delete()
+                enqueue_notifications([Notification(
+                    kind=Notification.INCOMES_REJECT,
+                    user_id=instance.volunteer.user_id,
+                    project_id=instance.project_id,
+                    context=get_site_data(self.context.get('request', {})),
+                )])
+            instance.status_incomes = ProjectIncomes.REJECTED
+            instance.save()
         return {'message': 'Заявка волонтера отклонена организатором.'}
 
     def to_representation(self, instance):
         return ProjectIncomesGetSerializer(instance).data
 
 
+class ProjectIncomesBulkSerializer(serializers.Serializer):
+    """
+    Сериализатор для принятия или отклонения нескольких заявок сразу.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.MAX_INCOMES_BULK,
+    )
+    status_incomes = serializers.ChoiceField(
+        choices=(ProjectIncomes.ACCEPTED, ProjectIncomes.REJECTED)
+    )
+
+    def bulk_update_incomes(self):
+        """
+        Меняет статус заявок организатора в одной транзакции.
+
+        Заявки блокируются на время изменения, участники создаются и
+        удаляются пакетно, уведомления записываются в outbox в той же
+        транзакции. Возвращает результат по каждой заявке.
+        """
+        ids = list(dict.fromkeys(self.validated_data['ids']))
+        status_incomes = self.validated_data['status_incomes']
+        request = self.context['request']
+        own_incomes = ProjectIncomes.objects.filter(
+            pk__in=ids, project__organization__contact_person=request.user
+        )
+        with transaction.atomic():
+            # Проекты блокируются раньше заявок, как при принятии одной
+            # заявки (take_places)
+            projects = {
+                project.pk: project
+                for project in Project.objects.lock(
+                    own_incomes.values('project')
+                ).only('participants_count', 'max_participants')
+            }
+            incomes = (
+                own_incomes.select_for_update(of=('self',))
+                .filter(project__in=projects)
+                .select_related('volunteer')
+                .in_bulk()
+            )
+            pairs = {
+                (income.project_id, income.volunteer_id)
+                for income in incomes.values()
+            }
+            participants = {
+                (participant.project_id, participant.volunteer_id): participant
+                for participant in ProjectParticipants.objects.filter(
+                    project__in={project for project, _ in pairs},
+                    volunteer__in={volunteer for _, volunteer in pairs},
+                )
+            }
+            if status_incomes == ProjectIncomes.ACCEPTED:
+                results, changed = self.accept(
+                    ids, incomes, participants, projects
+                )
+            else:
+                results, changed = self.reject(ids, incomes, participants)
+            ProjectIncomes.objects.filter(
+                pk__in=[income.pk for income in changed]
+            ).update(status_incomes=status_incomes)
+            kind = (
+                Notification.INCOMES_APPROVE
+                if status_incomes == ProjectIncomes.ACCEPTED
+                else Notification.INCOMES_REJECT
+            )
+            site_data = get_site_data(request)
+            enqueue_notifications([
+                Notification(
+                    kind=kind,
+                    user_id=income.volunteer.user_id,
+                    project_id=income.project_id,
+                    context=site_data,
+                )
+                for income in changed
+                if status_incomes == ProjectIncomes.ACCEPTED
+                or income.status_incomes == ProjectIncomes.ACCEPTED
+            ])
+        return results
+
+    def accept(self, ids, incomes, participants, projects):
+        """
+        Добавляет волонтеров из заявок в участники проектов в пределах
+        свободных мест.
+        """
+        results, changed, new_participants = [], [], []
+        free_places = {
+            project.pk: (
+                None if project.max_participants is None
+                else project.max_participants - project.participants_count
+            )
+            for project in projects.values()
+        }
+        for pk in ids:
+            income = incomes.get(pk)
+            if income is None:
+                results.append({'id': pk, 'error': 'Заявка не найдена.'})
+                continue
+            key = (income.project_id, income.volunteer_id)
+            if key in participants:
+                results.append({
+                    'id': pk,
+                    'error': 'Этот волонтер уже является участником проекта.',
+                })
+                continue
+            if free_places[income.project_id] is not None:
+                if free_places[income.project_id] <= 0:
+                    results.append({
+                        'id': pk,
+                        'error': 'В проекте не осталось свободных мест.',
+                    })
+                    continue
+                free_places[income.project_id] -= 1
+            participants[key] = ProjectParticipants(
+                project_id=income.project_id, volunteer_id=income.volunteer_id
+            )
+            new_participants.append(participants[key])
+            changed.append(income)
+            results.append(
+                {'id': pk, 'status_incomes': ProjectIncomes.ACCEPTED}
+            )
+        ProjectParticipants.objects.bulk_create(new_participants)
+        taken = Counter(
+            participant.project_id for participant in new_participants
+        )
+        for project_id, count in taken.items():
+            Project.objects.filter(pk=project_id).update(
+                participants_count=F('participants_count') + count
+            )
+        Project.participants.through.objects.bulk_create(
+            Project.participants.through(
+                project_id=participant.project_id,
+                projectparticipants_id=participant.pk,
+            )
+            for participant in new_participants
+        )
+        return results, changed
+
+    def reject(self, ids, incomes, participants):
+        """
+        Отклоняет заявки и исключает принятых волонтеров из участников.
+        """
+        results, changed, removed_participants = [], [], []
+        for pk in ids:
+            income = incomes.get(pk)
+            if income is None:
+                results.append({'id': pk, 'error': 'Заявка не найдена.'})
+                continue
+            if income.status_incomes == ProjectIncomes.REJECTED:
+                results.append(
+                    {'id': pk, 'error': 'Вы уже отклоняли данную заявку'}
+                )
+                continue
+            if income.status_incomes == ProjectIncomes.ACCEPTED:
+                participant = participants.pop(
+                    (income.project_id, income.volunteer_id), None
+                )
+                if participant is not None:
+                    removed_participants.append(participant.pk)
+            changed.append(income)
+            results.append(
+                {'id': pk, 'status_incomes': ProjectIncomes.REJECTED}
+            )
+        ProjectParticipants.objects.filter(
+            pk__in=removed_participants
+        ).delete()
+        return results, changed
+
+
 class OrganizationGetSerializer(serializers.ModelSerializer):
     """
     Сериализатор для отображения организации-организатора.
     """
 
     contact_person = UserSerializer()
+    photo_srcset = ImageVariantsField('photo')
 
     class Meta:
         model = Organization
-        fields = '__all__'
+        exclude = ('photo_variants',)
 
 
 class OgranizationCreateSerializer(
@@ -801,6 +1077,7 @@ class OgranizationCreateSerializer(
 
     contact_person = UserCreateSerializer()
     photo = Base64ImageField(required=False)
+    photo_srcset = ImageVariantsField('photo')
 
     @transaction.atomic
     def create(self, validated_data):
@@ -817,7 +1094,7 @@ class OgranizationCreateSerializer(
 
     class Meta:
         model = Organization
-        fields = '__all__'
+        exclude = ('photo_variants',)
 
 
 class OgranizationUpdateSerializer(OgranizationCreateSerializer):
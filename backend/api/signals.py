@@ -0,0 +1,146 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from taggit.models import Tag
+
+from content.models import City, News, PlatformAbout, Skills, Valuation
+from projects.models import (
+    Category,
+    Organization,
+    Project,
+    ProjectImage,
+    ProjectParticipants,
+    Volunteer,
+)
+
+from .cache import (
+    bump_reference_version,
+    change_platform_counter,
+    get_reference_name,
+    invalidate_platform_about,
+)
+from .images import get_image_fields, needs_processing
+from .tasks import make_image_variants
+
+PLATFORM_MEMBER_COUNTERS = {
+    Volunteer: 'volunteers_count',
+    Organization: 'organizers_count',
+}
+
+
+@receiver(post_save, sender=PlatformAbout)
+@receiver(post_delete, sender=PlatformAbout)
+@receiver(post_save, sender=Valuation)
+@receiver(post_delete, sender=Valuation)
+def reset_platform_about_cache(sender, **kwargs):
+    """
+    Сбрасывает кеш информации о Платформе после фиксации изменения
+    данных, из которых она собирается. Сброс до фиксации позволил бы
+    параллельному запросу вернуть в кеш прежние данные.
+    """
+    transaction.on_commit(invalidate_platform_about)
+
+
+def change_platform_counter_on_commit(name, delta):
+    if delta:
+        transaction.on_commit(partial(change_platform_counter, name, delta))
+
+
+@receiver(post_save, sender=Volunteer)
+@receiver(post_save, sender=Organization)
+def count_created_member(sender, instance, created, **kwargs):
+    if created:
+        change_platform_counter_on_commit(PLATFORM_MEMBER_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Volunteer)
+@receiver(post_delete, sender=Organization)
+def count_deleted_member(sender, instance, **kwargs):
+    change_platform_counter_on_commit(PLATFORM_MEMBER_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Project)
+def count_approved_project(sender, instance, created, update_fields=None,
+                           **kwargs):
+    """
+    Меняет счетчик одобренных проектов при смене статуса проекта.
+    """
+    if update_fields is not None and 'status_approve' not in update_fields:
+        return
+    if created:
+        before = None
+    elif hasattr(instance, '_loaded_status_approve'):
+        before = instance._loaded_status_approve
+    else:
+        # Прежний статус неизвестен, счетчик будет посчитан заново
+        transaction.on_commit(invalidate_platform_about)
+        return
+    instance._loaded_status_approve = instance.status_approve
+    change_platform_counter_on_commit(
+        'projects_count',
+        (instance.status_approve == Project.APPROVED)
+        - (before == Project.APPROVED),
+    )
+
+
+@receiver(post_delete, sender=Project)
+def count_deleted_project(sender, instance, **kwargs):
+    if instance.status_approve == Project.APPROVED:
+        change_platform_counter_on_commit('projects_count', -1)
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=Skills)
+@receiver(post_delete, sender=Skills)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_reference_cache_version(sender, **kwargs):
+    """
+    Обновляет версию справочника при изменении его записей.
+
+    Версия меняется после фиксации транзакции: иначе параллельный запрос
+    успел бы сохранить под новой версией данные без этого изменения.
+    """
+    transaction.on_commit(
+        partial(bump_reference_version, get_reference_name(sender))
+    )
+
+
+@receiver(post_delete, sender=ProjectParticipants)
+def release_project_place(sender, instance, **kwargs):
+    """
+    Освобождает место в проекте при удалении участника.
+    """
+    Project.objects.filter(
+        pk=instance.project_id, participants_count__gt=0
+    ).update(participants_count=F('participants_count') - 1)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Volunteer)
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_save, sender=News)
+def enqueue_image_variants(sender, instance, **kwargs):
+    """
+    Ставит в очередь подготовку вариантов нового изображения. Оригинал
+    уже сохранен, до готовности вариантов отдается он.
+    """
+    deferred = instance.get_deferred_fields()
+    for field_name in get_image_fields(sender):
+        if field_name in deferred or not needs_processing(
+            instance, field_name
+        ):
+            continue
+        transaction.on_commit(partial(
+            make_image_variants.delay,
+            sender._meta.label,
+            instance.pk,
+            field_name,
+        ))
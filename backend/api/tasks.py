@@ -0,0 +1,22 @@
+from celery import shared_task
+
+from .cache import refresh_platform_about
+from .images import process_image
+
+
+@shared_task
+def refresh_platform_about_cache():
+    """
+    Периодически пересчитывает счетчики Платформы: массовые изменения
+    через queryset.update() (например, одобрение проектов в админке)
+    не вызывают сигналов.
+    """
+    refresh_platform_about()
+
+
+@shared_task
+def make_image_variants(model_label, pk, field_name, force=False):
+    """
+    Готовит уменьшенные варианты загруженного изображения в WebP и JPEG.
+    """
+    process_image(model_label, pk, field_name, force)
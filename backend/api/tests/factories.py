@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+from itertools import count
+
+from django.utils import timezone
+
+from content.models import City
+from projects.models import (
+    Organization,
+    Project,
+    ProjectIncomes,
+    ProjectParticipants,
+    Volunteer,
+)
+from users.models import User
+
+_numbers = count(1)
+
+
+def create_user(role, **kwargs):
+    number = next(_numbers)
+    return User.objects.create_user(
+        email=f'{role}{number}@example.com',
+        password='password',
+        first_name='Иван',
+        second_name='Иванович',
+        last_name='Иванов',
+        role=role,
+        **kwargs,
+    )
+
+
+def create_city():
+    return City.objects.create(name=f'Город {next(_numbers)}')
+
+
+def create_organization(city=None):
+    number = next(_numbers)
+    return Organization.objects.create(
+        contact_person=create_user(User.ORGANIZER),
+        title=f'Организация {number}',
+        ogrn=f'{10 ** 12 + number:013d}',
+        phone='+79000000000',
+        city=city or create_city(),
+    )
+
+
+def create_volunteer(city=None):
+    return Volunteer.objects.create(
+        user=create_user(User.VOLUNTEER),
+        city=city or create_city(),
+        date_of_birth=date(1990, 1, 1),
+    )
+
+
+def create_project(organization, **kwargs):
+    """
+    Одобренный проект с открытым приемом заявок.
+    """
+    now = timezone.now()
+    fields = {
+        'name': f'Проект {next(_numbers)}',
+        'organization': organization,
+        'city': organization.city,
+        'status_approve': Project.APPROVED,
+        'start_date_application': now - timedelta(days=1),
+        'end_date_application': now + timedelta(days=7),
+        'start_datetime': now + timedelta(days=8),
+        'end_datetime': now + timedelta(days=8, hours=3),
+    }
+    fields.update(kwargs)
+    return Project.objects.create(**fields)
+
+
+def create_income(project, volunteer=None, **kwargs):
+    return ProjectIncomes.objects.create(
+        project=project, volunteer=volunteer or create_volunteer(), **kwargs
+    )
+
+
+def add_participant(project, volunteer=None):
+    """
+    Добавляет участника так же, как принятие заявки.
+    """
+    participant = ProjectParticipants.objects.create(
+        project=project, volunteer=volunteer or create_volunteer()
+    )
+    project.participants.add(participant)
+    Project.objects.take_places(project.pk)
+    return participant
@@ -0,0 +1,143 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from projects.models import Project, ProjectIncomes, ProjectParticipants
+
+from .factories import create_income, create_organization, create_project
+
+NOT_FOUND = 'Заявка не найдена.'
+NO_PLACES = 'В проекте не осталось свободных мест.'
+
+
+class ProjectIncomesBulkTests(TestCase):
+    """
+    Пакетное принятие и отклонение заявок организатором.
+
+    Гонка пакетного и одиночного принятия одной заявки проверяется в
+    test_participants: ей нужны зафиксированные данные.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization()
+        cls.project = create_project(cls.organization, max_participants=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.organization.contact_person)
+
+    def bulk(self, incomes, status_incomes):
+        response = self.client.post('/api/incomes/bulk/', {
+            'ids': [
+                income if isinstance(income, int) else income.pk
+                for income in incomes
+            ],
+            'status_incomes': status_incomes,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def assert_participants(self, project, incomes):
+        project.refresh_from_db()
+        self.assertEqual(project.participants_count, len(incomes))
+        self.assertEqual(
+            set(
+                ProjectParticipants.objects.filter(project=project)
+                .values_list('volunteer', flat=True)
+            ),
+            {income.volunteer_id for income in incomes},
+        )
+        self.assertEqual(
+            set(project.participants.values_list('volunteer', flat=True)),
+            {income.volunteer_id for income in incomes},
+        )
+
+    def assert_statuses(self, **statuses):
+        for income, status_incomes in statuses.items():
+            self.assertEqual(
+                ProjectIncomes.objects.get(pk=income).status_incomes,
+                status_incomes,
+            )
+
+    def test_accept_then_reject(self):
+        first, second, third = (
+            create_income(self.project) for _ in range(3)
+        )
+        results = self.bulk([first, second], ProjectIncomes.ACCEPTED)
+
+        self.assertEqual(results, [
+            {'id': first.pk, 'status_incomes': ProjectIncomes.ACCEPTED},
+            {'id': second.pk, 'status_incomes': ProjectIncomes.ACCEPTED},
+        ])
+        self.assert_participants(self.project, [first, second])
+
+        results = self.bulk([first, third, third], ProjectIncomes.REJECTED)
+
+        self.assertEqual(results, [
+            {'id': first.pk, 'status_incomes': ProjectIncomes.REJECTED},
+            {'id': third.pk, 'status_incomes': ProjectIncomes.REJECTED},
+        ])
+        self.assert_participants(self.project, [second])
+        self.assert_statuses(**{
+            str(first.pk): ProjectIncomes.REJECTED,
+            str(second.pk): ProjectIncomes.ACCEPTED,
+            str(third.pk): ProjectIncomes.REJECTED,
+        })
+        # Об отклонении сообщается только принятым ранее волонтерам
+        self.assertEqual(
+            sorted(
+                Notification.objects.filter(project=self.project)
+                .values_list('kind', 'user')
+            ),
+            sorted([
+                (Notification.INCOMES_APPROVE, first.volunteer.user_id),
+                (Notification.INCOMES_APPROVE, second.volunteer.user_id),
+                (Notification.INCOMES_REJECT, first.volunteer.user_id),
+            ]),
+        )
+
+    def test_foreign_and_missing_incomes(self):
+        own = create_income(self.project)
+        foreign = create_income(create_project(create_organization()))
+        results = self.bulk([foreign, own, 0], ProjectIncomes.ACCEPTED)
+
+        self.assertEqual(results, [
+            {'id': foreign.pk, 'error': NOT_FOUND},
+            {'id': own.pk, 'status_incomes': ProjectIncomes.ACCEPTED},
+            {'id': 0, 'error': NOT_FOUND},
+        ])
+        self.assert_statuses(**{
+            str(foreign.pk): ProjectIncomes.APPLICATION_SUBMITTED,
+        })
+        self.assert_participants(foreign.project, [])
+
+    def test_capacity_limit_within_batch(self):
+        other = create_project(self.organization)
+        incomes = [create_income(self.project) for _ in range(3)]
+        unlimited = [create_income(other) for _ in range(3)]
+        results = self.bulk(
+            [incomes[0], unlimited[0], incomes[1], incomes[2]] + unlimited[1:],
+            ProjectIncomes.ACCEPTED,
+        )
+
+        self.assertEqual(
+            [result.get('error') for result in results],
+            [None, None, None, NO_PLACES, None, None],
+        )
+        self.assert_participants(self.project, incomes[:2])
+        self.assert_participants(other, unlimited)
+        self.assert_statuses(**{
+            str(incomes[2].pk): ProjectIncomes.APPLICATION_SUBMITTED,
+        })
+
+    def test_already_taken_places_are_counted(self):
+        Project.objects.take_places(self.project.pk)
+        incomes = [create_income(self.project) for _ in range(2)]
+        results = self.bulk(incomes, ProjectIncomes.ACCEPTED)
+
+        self.assertEqual(
+            [result.get('error') for result in results], [None, NO_PLACES]
+        )
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.participants_count, 2)
@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from notifications.models import Notification
+from notifications.tasks import enqueue_notifications, send_notifications
+
+from .factories import create_organization, create_project, create_volunteer
+
+CONTEXT = {
+    'domain': 'example.com',
+    'site_name': 'Волонтеры',
+    'protocol': 'https',
+}
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }},
+    NOTIFICATIONS_RATE_LIMIT=0,
+    NOTIFICATIONS_RETRY_DELAY=60,
+    NOTIFICATIONS_MAX_ATTEMPTS=3,
+    NOTIFICATIONS_CLAIM_TIMEOUT=15 * 60,
+)
+class NotificationsOutboxTests(TestCase):
+    """
+    Отправка уведомлений из outbox.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = create_project(create_organization())
+        cls.volunteer = create_volunteer()
+
+    def create_notification(self, **kwargs):
+        return Notification.objects.create(
+            kind=Notification.INCOMES_APPROVE,
+            user=self.volunteer.user,
+            project=self.project,
+            context=CONTEXT,
+            **kwargs,
+        )
+
+    def test_pending_is_sent(self):
+        notification = self.create_notification()
+
+        self.assertEqual(send_notifications(), 1)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.SENT)
+        self.assertEqual(notification.attempts, 1)
+        self.assertIsNotNone(notification.sent_at)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.volunteer.user.email])
+        # Повторный запуск не отправляет письмо еще раз
+        self.assertEqual(send_notifications(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(
+        EMAIL_BACKEND='api.tests.test_notifications.FailingBackend'
+    )
+    def test_failed_send_is_retried_with_backoff(self):
+        notification = self.create_notification()
+
+        for attempt in range(1, 3):
+            started = timezone.now()
+            send_notifications()
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, Notification.PENDING)
+            self.assertEqual(notification.attempts, attempt)
+            self.assertIn('SMTP недоступен', notification.error)
+            self.assertGreaterEqual(
+                notification.next_attempt_at,
+                started + timedelta(seconds=60 * attempt),
+            )
+            # До наступления next_attempt_at уведомление не забирается
+            send_notifications()
+            notification.refresh_from_db()
+            self.assertEqual(notification.attempts, attempt)
+            Notification.objects.filter(pk=notification.pk).update(
+                next_attempt_at=timezone.now()
+            )
+
+        send_notifications()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.FAILED)
+        self.assertEqual(notification.attempts, 3)
+        Notification.objects.filter(pk=notification.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        send_notifications()
+        notification.refresh_from_db()
+        self.assertEqual(notification.attempts, 3)
+
+    def test_stale_sending_is_reclaimed(self):
+        now = timezone.now()
+        stale = self.create_notification(
+            status=Notification.SENDING,
+            claimed_at=now - timedelta(minutes=16),
+        )
+        fresh = self.create_notification(
+            status=Notification.SENDING,
+            claimed_at=now - timedelta(minutes=1),
+        )
+
+        self.assertEqual(send_notifications(), 1)
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, Notification.SENT)
+        self.assertEqual(fresh.status, Notification.SENDING)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_send_only_given_ids(self):
+        own = self.create_notification()
+        other = self.create_notification()
+
+        self.assertEqual(send_notifications([own.pk]), 1)
+
+        other.refresh_from_db()
+        self.assertEqual(other.status, Notification.PENDING)
+        self.assertEqual(other.attempts, 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rolled_back_enqueue_is_not_sent(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                enqueue_notifications([Notification(
+                    kind=Notification.INCOMES_APPROVE,
+                    user=self.volunteer.user,
+                    project=self.project,
+                    context=CONTEXT,
+                )])
+                transaction.set_rollback(True)
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(send_notifications(), 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_committed_enqueue_is_sent(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue_notifications([Notification(
+                kind=Notification.INCOMES_APPROVE,
+                user=self.volunteer.user,
+                project=self.project,
+                context=CONTEXT,
+            )])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(mail.outbox, [])
+        send_notifications()
+        self.assertEqual(
+            Notification.objects.get().status, Notification.SENT
+        )
+        self.assertEqual(len(mail.outbox), 1)
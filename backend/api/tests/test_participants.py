@@ -0,0 +1,136 @@
+from threading import Barrier, Thread
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from api.serializers import DraftProjectSerializer, ProjectSerializer
+from projects.models import Project, ProjectIncomes, ProjectParticipants
+
+from .factories import create_income, create_organization, create_project
+
+
+class ParticipantsCountTests(TransactionTestCase):
+    """
+    Счетчик участников проекта при параллельных изменениях.
+
+    Запросы в потоках работают через отдельные соединения с БД, поэтому
+    данные должны быть зафиксированы: нужен TransactionTestCase.
+    """
+
+    def setUp(self):
+        self.organization = create_organization()
+        self.project = create_project(self.organization, max_participants=2)
+        Project.objects.take_places(self.project.pk)
+
+    def post(self, url, data, barrier, responses):
+        client = APIClient()
+        client.force_authenticate(self.organization.contact_person)
+        try:
+            barrier.wait()
+            responses.append(client.post(url, data, format='json'))
+        except Exception as error:
+            responses.append(error)
+        finally:
+            connection.close()
+
+    def run_parallel(self, requests):
+        barrier = Barrier(len(requests))
+        responses = []
+        threads = [
+            Thread(target=self.post, args=(url, data, barrier, responses))
+            for url, data in requests
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for response in responses:
+            if isinstance(response, Exception):
+                raise response
+        return responses
+
+    def test_parallel_accepts_take_last_place_once(self):
+        incomes = [create_income(self.project) for _ in range(4)]
+        responses = self.run_parallel([
+            (f'/api/incomes/{income.pk}/accept_incomes/', None)
+            for income in incomes
+        ])
+
+        self.assertEqual(
+            sorted(response.status_code for response in responses),
+            [200, 400, 400, 400],
+        )
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.participants_count, 2)
+        self.assertEqual(
+            ProjectParticipants.objects.filter(project=self.project).count(),
+            1,
+        )
+        self.assertEqual(
+            ProjectIncomes.objects.filter(
+                project=self.project, status_incomes=ProjectIncomes.ACCEPTED
+            ).count(),
+            1,
+        )
+
+    def test_parallel_bulk_and_single_accepts(self):
+        """
+        Пакетное и одиночное принятие тех же заявок блокируют проекты в
+        одном порядке и не взаимоблокируются. Исход гонки зависит от
+        планировщика, поэтому сценарий повторяется.
+        """
+        for _ in range(5):
+            projects = [
+                create_project(self.organization, max_participants=1)
+                for _ in range(2)
+            ]
+            incomes = [create_income(project) for project in projects]
+            responses = self.run_parallel(
+                [('/api/incomes/bulk/', {
+                    'ids': [income.pk for income in reversed(incomes)],
+                    'status_incomes': ProjectIncomes.ACCEPTED,
+                })]
+                + [
+                    (f'/api/incomes/{income.pk}/accept_incomes/', None)
+                    for income in incomes
+                ]
+            )
+
+            self.assertTrue(all(
+                response.status_code in (200, 400) for response in responses
+            ))
+            for project in projects:
+                project.refresh_from_db()
+                self.assertEqual(project.participants_count, 1)
+                self.assertEqual(
+                    ProjectParticipants.objects.filter(
+                        project=project
+                    ).count(),
+                    1,
+                )
+
+    def test_save_keeps_concurrent_participants_count(self):
+        project = Project.objects.get(pk=self.project.pk)
+        Project.objects.take_places(self.project.pk)
+        project.name = 'Новое название'
+        project.save()
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Новое название')
+        self.assertEqual(self.project.participants_count, 2)
+
+    def test_max_participants_not_below_participants_count(self):
+        Project.objects.take_places(self.project.pk)
+        self.project.refresh_from_db()
+        for serializer_class in (ProjectSerializer, DraftProjectSerializer):
+            serializer = serializer_class(
+                self.project, data={'max_participants': 1}, partial=True
+            )
+            self.assertFalse(serializer.is_valid())
+            self.assertIn('max_participants', serializer.errors)
+            serializer = serializer_class(
+                self.project, data={'max_participants': 2}, partial=True
+            )
+            serializer.is_valid()
+            self.assertNotIn('max_participants', serializer.errors)
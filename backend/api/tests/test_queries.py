@@ -0,0 +1,71 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from content.models import Skills
+from projects.models import Category, ProjectImage, ProjectSkills
+
+from .factories import (
+    add_participant,
+    create_organization,
+    create_project,
+    create_volunteer,
+)
+
+
+class ProjectQueriesTests(TestCase):
+    """
+    Число SQL запросов эндпоинтов проектов не зависит от числа проектов
+    и их связей.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization()
+        cls.volunteer = create_volunteer(city=cls.organization.city)
+        cls.category = Category.objects.create(
+            name='Экология', slug='ecology', description='Экология'
+        )
+        cls.skill = Skills.objects.create(name='Уборка')
+        cls.project = cls.create_projects(1)[0]
+
+    @classmethod
+    def create_projects(cls, count):
+        projects = []
+        for _ in range(count):
+            project = create_project(cls.organization, max_participants=10)
+            project.categories.add(cls.category)
+            ProjectSkills.objects.create(project=project, skill=cls.skill)
+            ProjectImage.objects.create(project=project)
+            add_participant(project, cls.volunteer)
+            add_participant(project)
+            projects.append(project)
+        return projects
+
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def assert_queries(self, number, url, user=None):
+        client = self.get_client(user)
+        with self.assertNumQueries(number):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        self.create_projects(4)
+        self.assert_queries(6, '/api/projects/')
+        self.assert_queries(6, '/api/projects/', self.volunteer.user)
+
+    def test_retrieve(self):
+        url = f'/api/projects/{self.project.pk}/'
+        self.assert_queries(5, url)
+        self.assert_queries(5, url, self.volunteer.user)
+
+    def test_me(self):
+        self.create_projects(4)
+        url = '/api/projects/me/'
+        self.assert_queries(6, url, self.organization.contact_person)
+        self.assert_queries(6, url, self.volunteer.user)
@@ -0,0 +1,88 @@
+from django.test import TestCase, override_settings
+from django.urls import path
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.middleware import QueryBudgetExceeded, fingerprint, get_query_budget
+from users.models import User
+
+
+class RepeatedQueriesView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    query_budget = {'get': 2, 'post': 3}
+
+    def get(self, request):
+        for pk in range(3):
+            User.objects.filter(pk=pk).exists()
+        return Response()
+
+    post = get
+
+
+class BudgetViewSet(viewsets.ViewSet):
+    query_budget = {'list': 1, 'retrieve': 2, 'get': 3}
+
+
+class FixedBudgetView(APIView):
+    query_budget = 4
+
+
+urlpatterns = [path('repeated/', RepeatedQueriesView.as_view())]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class QueryBudgetTests(TestCase):
+
+    def test_fingerprint_groups_queries_with_different_arguments(self):
+        self.assertEqual(
+            fingerprint(
+                "SELECT * FROM t WHERE id = 5 AND name = 'it''s'\n"
+                "  AND tag IN (%s, %s, %s)"
+            ),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND tag IN (...)',
+        )
+
+    def test_budget_by_action_and_method(self):
+        self.assertEqual(
+            get_query_budget(BudgetViewSet.as_view({'get': 'list'}), 'get'),
+            1,
+        )
+        self.assertEqual(
+            get_query_budget(
+                BudgetViewSet.as_view({'get': 'retrieve'}), 'get'
+            ),
+            2,
+        )
+        # Действие без своего бюджета берет бюджет метода
+        self.assertEqual(
+            get_query_budget(
+                BudgetViewSet.as_view({'get': 'other'}), 'get'
+            ),
+            3,
+        )
+        view = RepeatedQueriesView.as_view()
+        self.assertEqual(get_query_budget(view, 'get'), 2)
+        self.assertEqual(get_query_budget(view, 'post'), 3)
+        self.assertIsNone(get_query_budget(view, 'put'))
+        self.assertEqual(
+            get_query_budget(FixedBudgetView.as_view(), 'delete'), 4
+        )
+
+    def test_raise_mode_shows_repeated_fingerprint(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            self.client.get('/repeated/')
+        message = str(raised.exception)
+        self.assertIn('GET /repeated/: 3 SQL queries, budget 2', message)
+        self.assertRegex(message, r'3 x SELECT .*"users_user"."id" = \?')
+
+    def test_within_budget(self):
+        self.assertEqual(self.client.post('/repeated/').status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='log', QUERY_BUDGET_SAMPLE_RATE=1)
+    def test_log_mode_warns(self):
+        with self.assertLogs('api.middleware', 'WARNING') as logs:
+            response = self.client.get('/repeated/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('3 SQL queries, budget 2', logs.output[0])
@@ -8,6 +8,7 @@ from api.views import (
     NewsViewSet,
     OrganizationViewSet,
     PlatformAboutView,
+    ProfilingView,
     ProjectCategoryViewSet,
     ProjectIncomesViewSet,
     ProjectMeViewSet,
@@ -15,6 +16,7 @@ from api.views import (
     ProjectViewSet,
     SearchListView,
     SkillsViewSet,
+    SuggestView,
     TagViewSet,
     VolunteerViewSet,
 )
@@ -70,5 +72,7 @@ urlpatterns = [
     path('platform_about/', PlatformAboutView.as_view()),
     path('feedback/', FeedbackCreateView.as_view()),
     path('search/', SearchListView.as_view()),
+    path('suggest/', SuggestView.as_view()),
+    path('profiling/', ProfilingView.as_view()),
     # path('volunteers/<int:pk>/profile/', VolunteerProfileView.as_view()),
 ]
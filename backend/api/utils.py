@@ -1,18 +1,30 @@
+from copy import copy
+
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from djoser.compat import get_user_email
 from djoser.conf import settings
 from drf_extra_fields.fields import Base64ImageField
+from rest_framework.fields import Field
+from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.serializers import ValidationError
 
 from projects.models import Project
 
+from .cache import get_reference_instances, get_reference_name
+from .images import get_variants_field, needs_processing
+
 
 def create_user(self, serializer, data):
     """
     Функция создания объекта пользователя с отправкой ссылки для активации
     аккаунта и подтверждения завершения процедуры подтверждения email-а.
+
+    Письма отправляются задачей Celery после фиксации транзакции
+    регистрации (см. users.auth.email).
     """
 
     user_serializer = serializer(data=data)
@@ -59,6 +71,92 @@ class NonEmptyBase64ImageField(Base64ImageField):
         return value
 
 
+class ImageVariantsField(Field):
+    """
+    Уменьшенные варианты изображения из поля image_field для атрибутов
+    srcset/sizes тега <img> или <picture>.
+
+    Отдает ссылки на каждый размер в каждом формате и готовые строки
+    srcset по форматам. Пока варианты не готовы, отдает None: клиент
+    показывает оригинал.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def build_url(self, path):
+        url = default_storage.url(path)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, instance):
+        if not getattr(instance, self.image_field) or needs_processing(
+            instance, self.image_field
+        ):
+            return None
+        variants = getattr(instance, get_variants_field(self.image_field))
+        representation = {}
+        srcset = {}
+        # JSONB не сохраняет порядок ключей
+        sizes = sorted(
+            variants['sizes'].items(), key=lambda item: item[1]['width']
+        )
+        for size, variant in sizes:
+            urls = {
+                extension: self.build_url(path)
+                for extension, path in variant['files'].items()
+            }
+            representation[size] = {
+                'width': variant['width'],
+                'height': variant['height'],
+                **urls,
+            }
+            for extension, url in urls.items():
+                # Маленький оригинал дает несколько вариантов одной ширины
+                widths = srcset.setdefault(extension, {})
+                widths.setdefault(variant['width'], url)
+        representation['srcset'] = {
+            extension: ', '.join(
+                f'{url} {width}w' for width, url in widths.items()
+            )
+            for extension, widths in srcset.items()
+        }
+        return representation
+
+
+class CachedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    Поле связи по первичному ключу, которое для справочников (города,
+    навыки, категории) ищет объекты в кешированном словаре, а не делает
+    запрос в БД на каждый переданный идентификатор.
+    """
+
+    def get_reference_instances(self):
+        if not hasattr(self, '_reference_instances'):
+            name = get_reference_name(self.get_queryset().model)
+            self._reference_instances = (
+                get_reference_instances(name) if name else None
+            )
+        return self._reference_instances
+
+    def to_internal_value(self, data):
+        instances = self.get_reference_instances()
+        if instances is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in instances:
+            self.fail('does_not_exist', pk_value=data)
+        return copy(instances[pk])
+
+
 def modify_errors(details, errors_valid):
     """
     Функция модификации деталей ошибок валидации в отдельные словари:
@@ -13,6 +13,23 @@ def validate_status_incomes(value):
     return value
 
 
+def validate_max_participants(project, value):
+    """
+    Проверяет, что новый лимит участников не меньше числа уже принятых
+    участников проекта.
+    """
+    if (
+        project is not None
+        and value is not None
+        and value < project.participants_count
+    ):
+        raise serializers.ValidationError(
+            'Максимальное количество участников не может быть меньше '
+            f'числа уже принятых участников ({project.participants_count}).'
+        )
+    return value
+
+
 def validate_dates(
     start_datetime,
     end_datetime,
@@ -1,24 +1,21 @@
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import transaction
+from django.db.models import Prefetch, Q, Value
+from django.db.models.functions import Upper
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import filters, generics, mixins, status, viewsets
+from rest_framework import generics, mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from taggit.models import Tag
 
 from api import schemas
-from backend.settings import VALUATIONS_ON_PAGE_ABOUT_US
-from content.models import (
-    City,
-    Feedback,
-    News,
-    PlatformAbout,
-    Skills,
-    Valuation,
-)
+from content.models import City, Feedback, News, Skills
 from projects.models import (
     Category,
     Organization,
@@ -29,16 +26,23 @@ from projects.models import (
     Volunteer,
 )
 
+from .cache import get_platform_about
 from .filters import (
     CityFilter,
     ProjectCategoryFilter,
     ProjectFilter,
+    ProjectFullTextSearchFilter,
     ProjectIncomesFilter,
     SkillsFilter,
     StatusProjectFilter,
     TagFilter,
 )
-from .mixins import DestroyUserMixin
+from .mixins import (
+    CachedReferenceListMixin,
+    DestroyUserMixin,
+    ProfiledSerializerMixin,
+)
+from .pagination import CursorOptInPagination
 from .permissions import (
     IsOrganizer,
     IsOrganizerOfProject,
@@ -48,6 +52,7 @@ from .permissions import (
     IsVolunteer,
     IsVolunteerOfIncomes,
 )
+from .profiling import load_profiles, summarize_profiles
 from .serializers import (
     ActiveProjectEditSerializer,
     CitySerializer,
@@ -59,10 +64,12 @@ from .serializers import (
     OrganizationGetSerializer,
     PlatformAboutSerializer,
     PreviewNewsSerializer,
+    PreviewProjectIncomesSerializer,
     ProjectCategorySerializer,
     ProjectCompleteSerializer,
     ProjectFavoriteSerializer,
     ProjectGetSerializer,
+    ProjectIncomesBulkSerializer,
     ProjectIncomesGetSerializer,
     ProjectIncomesSerializer,
     ProjectParticipantSerializer,
@@ -76,36 +83,41 @@ from .serializers import (
 from .utils import get_instance, is_correct_status_change
 
 
-class PlatformAboutView(generics.RetrieveAPIView):
+class PlatformAboutView(ProfiledSerializerMixin, generics.RetrieveAPIView):
     """
     Отображает информацию о Платформе.
 
     Любой пользователь может получить информацию о нас,
     ценностях и email Платформы.
-
+    Ответ отдается из кеша и поддерживает заголовок If-None-Match.
     """
 
     serializer_class = PlatformAboutSerializer
+    query_budget = 6
 
-    def get_object(self):
-        platform_about = PlatformAbout.objects.latest('id')
-        valuations = Valuation.objects.all()[:VALUATIONS_ON_PAGE_ABOUT_US]
-        return {
-            'about_us': platform_about.about_us,
-            'platform_email': platform_about.platform_email,
-            'valuations': valuations,
-        }
+    def retrieve(self, request, *args, **kwargs):
+        platform_about = get_platform_about()
+        response = get_conditional_response(
+            request, etag=platform_about['etag']
+        )
+        if response is None:
+            response = Response(platform_about['data'])
+        response['ETag'] = platform_about['etag']
+        return response
 
 
-class NewsViewSet(viewsets.ReadOnlyModelViewSet):
+class NewsViewSet(ProfiledSerializerMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для новостей.
 
     Позволяет просматривать новости списком и по отдельности.
     """
 
-    queryset = News.objects.all()
+    queryset = News.objects.select_related('author').prefetch_related('tags')
     serializer_class = NewsSerializer
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ('-created_at',)
+    query_budget = {'list': 4, 'retrieve': 3}
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -113,7 +125,7 @@ class NewsViewSet(viewsets.ReadOnlyModelViewSet):
         return NewsSerializer
 
 
-class FeedbackCreateView(generics.CreateAPIView):
+class FeedbackCreateView(ProfiledSerializerMixin, generics.CreateAPIView):
     """
     Представление для обращений.
 
@@ -126,7 +138,7 @@ class FeedbackCreateView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ProfiledSerializerMixin, viewsets.ModelViewSet):
     """
     Представление для проектов.
 
@@ -139,6 +151,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProjectFilter
     permission_classes = [IsOrganizerOrReadOnly]
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ('-start_date_application', 'id')
+    query_budget = {'list': 7, 'retrieve': 6}
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -157,14 +172,19 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return ProjectSerializer
 
     def get_queryset(self):
-        if self.request.user.is_authenticated:
-            if self.action == 'list':
-                return self.queryset.filter(status_approve=Project.APPROVED)
-            return self.queryset.filter(
+        queryset = self.queryset
+        if self.request.method in SAFE_METHODS:
+            queryset = (
+                queryset.with_related()
+                .with_status()
+                .with_is_favorited(self.request.user)
+            )
+        if self.request.user.is_authenticated and self.action != 'list':
+            return queryset.filter(
                 Q(status_approve=Project.APPROVED)
                 | Q(organization__contact_person=self.request.user)
             )
-        return self.queryset.filter(status_approve=Project.APPROVED)
+        return queryset.filter(status_approve=Project.APPROVED)
 
     def perform_create(self, serializer):
         serializer.save(organization=self.request.user.organization)
@@ -283,7 +303,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
 
 
-class ProjectParticipantsViewSet(mixins.DestroyModelMixin,
+class ProjectParticipantsViewSet(ProfiledSerializerMixin,
+                                 mixins.DestroyModelMixin,
                                  mixins.ListModelMixin,
                                  viewsets.GenericViewSet):
     """
@@ -293,10 +314,13 @@ class ProjectParticipantsViewSet(mixins.DestroyModelMixin,
     """
     serializer_class = ProjectParticipantSerializer
     permission_classes = [IsOrganizerOrReadOnly]
+    query_budget = {'list': 4}
 
     def get_queryset(self):
         return ProjectParticipants.objects.filter(
             project=self.kwargs.get('project_id')
+        ).select_related('volunteer__user').prefetch_related(
+            'volunteer__skills'
         )
 
     def destroy(self, request, **kwargs):
@@ -312,21 +336,29 @@ class ProjectParticipantsViewSet(mixins.DestroyModelMixin,
             volunteer=kwargs.get('pk')
         )
         if instance.project.organization.contact_person == request.user:
-            instance.delete()
+            with transaction.atomic():
+                # Проект блокируется раньше участника, см. Project.lock
+                list(Project.objects.lock([instance.project_id]))
+                instance.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'error': 'Удалять участников проекта может только организатор'},
             status=status.HTTP_403_FORBIDDEN)
 
 
-class VolunteerViewSet(DestroyUserMixin, viewsets.ModelViewSet):
+class VolunteerViewSet(
+    ProfiledSerializerMixin, DestroyUserMixin, viewsets.ModelViewSet
+):
     """
     Представление для волонтеров.
 
     Позволяет получать, создавать, редактировать, удалять участника-волонтера.
     """
 
-    queryset = Volunteer.objects.all()
+    queryset = Volunteer.objects.select_related('user').prefetch_related(
+        'skills'
+    )
+    query_budget = {'list': 4, 'retrieve': 3}
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -344,7 +376,9 @@ class VolunteerViewSet(DestroyUserMixin, viewsets.ModelViewSet):
         return super(VolunteerViewSet, self).get_permissions()
 
 
-class OrganizationViewSet(DestroyUserMixin, viewsets.ModelViewSet):
+class OrganizationViewSet(
+    ProfiledSerializerMixin, DestroyUserMixin, viewsets.ModelViewSet
+):
     """
     Представление для орагизаций - организаторов проекта.
 
@@ -352,7 +386,8 @@ class OrganizationViewSet(DestroyUserMixin, viewsets.ModelViewSet):
     удалять организацию-организатора проекта.
     """
 
-    queryset = Organization.objects.all()
+    queryset = Organization.objects.select_related('contact_person')
+    query_budget = {'list': 3, 'retrieve': 3}
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -370,7 +405,11 @@ class OrganizationViewSet(DestroyUserMixin, viewsets.ModelViewSet):
         return super(OrganizationViewSet, self).get_permissions()
 
 
-class CityViewSet(viewsets.ReadOnlyModelViewSet):
+class CityViewSet(
+    ProfiledSerializerMixin,
+    CachedReferenceListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     Представление для отображения городов.
 
@@ -380,10 +419,15 @@ class CityViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = City.objects.all()
     serializer_class = CitySerializer
     pagination_class = None
+    reference_name = 'cities'
     filterset_class = CityFilter
 
 
-class SkillsViewSet(viewsets.ReadOnlyModelViewSet):
+class SkillsViewSet(
+    ProfiledSerializerMixin,
+    CachedReferenceListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     Представление для отображения навыков.
 
@@ -393,10 +437,15 @@ class SkillsViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Skills.objects.all()
     serializer_class = SkillsSerializer
     pagination_class = None
+    reference_name = 'skills'
     filterset_class = SkillsFilter
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ProfiledSerializerMixin,
+    CachedReferenceListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     Представление для отображения тегов.
 
@@ -406,10 +455,15 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    reference_name = 'tags'
     filterset_class = TagFilter
 
 
-class ProjectCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjectCategoryViewSet(
+    ProfiledSerializerMixin,
+    CachedReferenceListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     Представление для отображения категорий проекта.
 
@@ -419,23 +473,89 @@ class ProjectCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = ProjectCategorySerializer
     pagination_class = None
+    reference_name = 'categories'
     filterset_class = ProjectCategoryFilter
 
 
-class SearchListView(generics.ListAPIView):
+class SearchListView(ProfiledSerializerMixin, generics.ListAPIView):
     """
     Представление для отображения строки поиска.
 
     ---
     """
 
-    queryset = Project.objects.all()
-    serializer_class = ProjectSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    search_fields = ['name', 'description', 'event_purpose']
+    serializer_class = ProjectGetSerializer
+    filter_backends = [DjangoFilterBackend, ProjectFullTextSearchFilter]
+    query_budget = 7
+
+    def get_queryset(self):
+        return (
+            Project.objects.filter(status_approve=Project.APPROVED)
+            .with_related()
+            .with_status()
+            .with_is_favorited(self.request.user)
+        )
+
+
+class SuggestView(generics.GenericAPIView):
+    """
+    Автодополнение для строки поиска.
+
+    Возвращает за один запрос наиболее похожие проекты, города, навыки,
+    категории и теги. Допускает опечатки: сравнение идет по триграммам
+    с использованием GIN индексов по UPPER(name).
+    """
+
+    permission_classes = (AllowAny,)
+    pagination_class = None
+    query_budget = 2
+
+    def get_suggest_querysets(self):
+        return {
+            'projects': Project.objects.filter(
+                status_approve=Project.APPROVED
+            ),
+            'cities': City.objects.all(),
+            'skills': Skills.objects.all(),
+            'categories': Category.objects.all(),
+            'tags': Tag.objects.all(),
+        }
+
+    def get_suggestions(self, query):
+        """
+        Собирает выборки по всем справочникам в один UNION ALL запрос.
+        """
+        upper_query = query.upper()
+        suggestions = [
+            queryset.alias(search_name=Upper('name'))
+            .filter(
+                Q(search_name__contains=upper_query)
+                | Q(search_name__trigram_word_similar=upper_query)
+            )
+            .annotate(
+                kind=Value(kind),
+                rank=TrigramWordSimilarity(Value(query), 'name'),
+            )
+            .order_by('-rank', 'name')
+            .values('id', 'name', 'kind', 'rank')[:settings.SUGGEST_LIMIT]
+            for kind, queryset in self.get_suggest_querysets().items()
+        ]
+        return suggestions[0].union(*suggestions[1:], all=True)
+
+    @swagger_auto_schema(manual_parameters=[schemas.suggest_params])
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        response_data = {kind: [] for kind in self.get_suggest_querysets()}
+        if len(query) >= settings.SUGGEST_MIN_LENGTH:
+            for suggestion in self.get_suggestions(query):
+                response_data[suggestion['kind']].append(
+                    {'id': suggestion['id'], 'name': suggestion['name']}
+                )
+        return Response(response_data, status=status.HTTP_200_OK)
 
 
 class ProjectIncomesViewSet(
+    ProfiledSerializerMixin,
     viewsets.GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -451,19 +571,49 @@ class ProjectIncomesViewSet(
     queryset = ProjectIncomes.objects.all()
     permission_classes = [IsVolunteer]
     filterset_class = ProjectIncomesFilter
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ('-created_at',)
+    query_budget = {'list': 9, 'retrieve': 10}
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated and user.is_organizer:
-            return ProjectIncomes.objects.filter(
+            queryset = ProjectIncomes.objects.filter(
                 project__organization__contact_person=user
             )
-        if user.is_authenticated and user.is_volunteer:
-            return user.volunteers.project_incomes.all()
+        elif user.is_authenticated and user.is_volunteer:
+            queryset = user.volunteers.project_incomes.all()
+        else:
+            return None
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        if self.expand_project():
+            project_queryset = (
+                Project.objects.with_related()
+                .with_status()
+                .with_is_favorited(user)
+            )
+        else:
+            project_queryset = Project.objects.only('name')
+        return queryset.select_related('volunteer__user').prefetch_related(
+            Prefetch('project', queryset=project_queryset),
+            Prefetch('volunteer__skills', queryset=Skills.objects.all()),
+        )
+
+    def expand_project(self):
+        """
+        Полные данные проекта отдаются только по запросу ?expand=project.
+        """
+        expand = self.request.query_params.get('expand', '')
+        return 'project' in expand.split(',')
 
     def get_serializer_class(self):
+        if self.action == 'bulk':
+            return ProjectIncomesBulkSerializer
         if self.request.method in SAFE_METHODS:
-            return ProjectIncomesGetSerializer
+            if self.expand_project():
+                return ProjectIncomesGetSerializer
+            return PreviewProjectIncomesSerializer
         return ProjectIncomesSerializer
 
     def get_permissions(self):
@@ -538,14 +688,36 @@ class ProjectIncomesViewSet(
         response_data = serializer.reject_incomes(instance)
         return Response(response_data, status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsOrganizerOfProject],
+    )
+    def bulk(self, request):
+        """
+        Принимает или отклоняет несколько заявок волонтеров.
+
+        Тело запроса: {"ids": [1, 2], "status_incomes": "accepted"}.
+        Возвращает результат по каждой заявке: новый статус или ошибку.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.bulk_update_incomes()
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
     @swagger_auto_schema(
-        manual_parameters=[schemas.project_incomes_filter_params]
+        manual_parameters=[
+            schemas.project_incomes_filter_params,
+            schemas.incomes_expand_params,
+        ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class ProjectMeViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
+class ProjectMeViewSet(
+    ProfiledSerializerMixin, viewsets.GenericViewSet, mixins.ListModelMixin
+):
     """
     Получить проекты текущего пользователя.
 
@@ -557,29 +729,62 @@ class ProjectMeViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
     filter_backends = [DjangoFilterBackend]
     filterset_class = StatusProjectFilter
     permission_classes = [IsOrganizer | IsVolunteer]
+    pagination_class = CursorOptInPagination
+    # В кабинете есть черновики без дат, поэтому курсор идет по дате создания
+    cursor_ordering = ('-created_at', 'id')
+    query_budget = {'list': 7, 'counts': 2}
 
     def get_queryset(self):
-        if self.request.user.is_volunteer:
-            volunteer = self.request.user.volunteers
-            volunteer_in_projects = Project.objects.filter(
-                participants__volunteer=volunteer
-            )
-            favorite_projects = Project.objects.filter(
-                Q(project_favorite__user=self.request.user)
-            )
-            return (favorite_projects | volunteer_in_projects).distinct()
-
-        if self.request.user.is_organizer:
-            favorite_projects = Project.objects.filter(
-                Q(project_favorite__user=self.request.user)
-            )
-            organizer_projects = Project.objects.filter(
-                organization__contact_person=self.request.user
-            )
-            return (favorite_projects | organizer_projects).distinct()
+        return (
+            Project.objects.cabinet(self.request.user)
+            .with_related()
+            .with_status()
+            .with_is_favorited(self.request.user)
+        )
 
     @swagger_auto_schema(
         manual_parameters=schemas.status_project_filter_params
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        filter_backends=[],
+        pagination_class=None,
+    )
+    def counts(self, request):
+        """
+        Количество проектов в табах кабинета текущего пользователя.
+
+        Ключи совпадают с параметрами фильтра /projects/me/?<таб>=true.
+        """
+        return Response(Project.objects.cabinet_counts(request.user))
+
+
+class ProfilingView(generics.GenericAPIView):
+    """
+    Профили запросов из кольцевого буфера ProfilingMiddleware.
+
+    Возвращает сводку по эндпоинтам, отсортированную по суммарному
+    времени, и сами записи, начиная с самых новых. Параметр view
+    оставляет записи одного представления. Доступно только
+    администраторам.
+    """
+
+    permission_classes = (IsAdminUser,)
+    pagination_class = None
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request, *args, **kwargs):
+        profiles = load_profiles()
+        view = request.query_params.get('view')
+        if view:
+            profiles = [
+                profile for profile in profiles if profile['view'] == view
+            ]
+        return Response({
+            'endpoints': summarize_profiles(profiles),
+            'requests': profiles,
+        })
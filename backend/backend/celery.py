@@ -4,6 +4,9 @@ import os
 
 from celery import Celery
 
+# Подключает обработчики сигналов, собирающие метрики задач
+from . import metrics  # noqa
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 app = Celery('celery_app')
 app.config_from_object('django.conf:settings', namespace='CELERY')
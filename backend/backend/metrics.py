@@ -0,0 +1,169 @@
+"""
+Метрики Prometheus веб-процессов и воркеров Celery.
+
+Gunicorn и пул Celery запускают несколько процессов, поэтому при заданной
+переменной окружения PROMETHEUS_MULTIPROC_DIR значения пишутся в файлы
+этого каталога и суммируются при выдаче. Каталог очищается при старте
+(см. gunicorn.conf.py и celeryd_init ниже) и у каждого контейнера свой:
+в именах файлов pid процесса, а pid в разных контейнерах совпадают.
+"""
+import os
+import shutil
+from datetime import datetime
+from time import perf_counter, time
+
+from celery.signals import (
+    before_task_publish,
+    celeryd_init,
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+    worker_ready,
+)
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса',
+    ('method', 'view', 'action'),
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    'http_requests',
+    'Обработанные запросы',
+    ('method', 'view', 'action', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'SQL запросов на запрос',
+    ('method', 'view', 'action'),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests',
+    'Обращения к кешу',
+    ('cache', 'result'),
+)
+TASK_RUNTIME = Histogram(
+    'celery_task_runtime_seconds',
+    'Время выполнения задачи Celery',
+    ('task', 'state'),
+    buckets=TASK_BUCKETS,
+)
+TASK_QUEUE_WAIT = Histogram(
+    'celery_task_queue_wait_seconds',
+    'Время задачи в очереди от публикации (или eta) до начала выполнения',
+    ('task',),
+    buckets=TASK_BUCKETS,
+)
+TASKS = Counter('celery_tasks', 'Выполненные задачи Celery', ('task', 'state'))
+EMAILS = Counter('emails', 'Отправленные письма', ('source', 'result'))
+
+# Время начала выполняемых в процессе задач: {task_id: perf_counter()}
+_task_started = {}
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def clear_multiprocess_dir():
+    """
+    Удаляет значения процессов предыдущего запуска.
+    """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def mark_process_dead(pid):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus. Адрес не проксируется nginx
+    и доступен только из внутренней сети.
+    """
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+def observe_request(method, view, action, status, seconds, queries):
+    REQUEST_LATENCY.labels(method, view, action).observe(seconds)
+    REQUESTS.labels(method, view, action, status).inc()
+    REQUEST_QUERIES.labels(method, view, action).observe(queries)
+
+
+@before_task_publish.connect
+def add_published_at(headers=None, **kwargs):
+    # Повтор задачи публикуется заново, время перезаписывается
+    headers['published_at'] = time()
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = perf_counter()
+    published_at = getattr(task.request, 'published_at', None)
+    if published_at is None:
+        return
+    eta = task.request.eta
+    if eta:
+        published_at = max(
+            published_at, datetime.fromisoformat(eta).timestamp()
+        )
+    TASK_QUEUE_WAIT.labels(task.name).observe(max(time() - published_at, 0))
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    state = state or 'UNKNOWN'
+    TASKS.labels(task.name, state).inc()
+    if started is not None:
+        TASK_RUNTIME.labels(task.name, state).observe(
+            perf_counter() - started
+        )
+
+
+@celeryd_init.connect
+def worker_init(**kwargs):
+    clear_multiprocess_dir()
+
+
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    from django.conf import settings
+
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(
+            settings.CELERY_METRICS_PORT, registry=get_registry()
+        )
+
+
+@worker_process_shutdown.connect
+def worker_process_stopped(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
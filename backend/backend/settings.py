@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'debug_toolbar',
     'django_filters',
     'django_object_actions',
@@ -51,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -61,6 +64,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
     # 'rest_framework.middleware.AuthenticationMiddleware',
     # 'rest_framework.middleware.AuthorizationMiddleware',
 ]
@@ -199,9 +203,24 @@ DJOSER = {
         'password_reset': 'users.auth.serializers.CustomSendEmailResetSerializer',
         'set_password': 'users.auth.serializers.CustomSetPasswordSerializer',
     },
+    'EMAIL': {
+        'activation': 'users.auth.email.ActivationEmail',
+        'confirmation': 'users.auth.email.ConfirmationEmail',
+        'password_reset': 'users.auth.email.PasswordResetEmail',
+        'password_changed_confirmation': (
+            'users.auth.email.PasswordChangedConfirmationEmail'
+        ),
+        'username_changed_confirmation': (
+            'users.auth.email.UsernameChangedConfirmationEmail'
+        ),
+        'username_reset': 'users.auth.email.UsernameResetEmail',
+    },
 }
 
-EMAIL_BACKEND = 'gmailapi_backend.mail.GmailBackend'
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'notifications.backends.GmailBackend'
+)
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
 GMAIL_API_CLIENT_ID = os.getenv('GMAIL_API_CLIENT_ID', '')
 GMAIL_API_CLIENT_SECRET = os.getenv('GMAIL_API_CLIENT_SECRET', '')
 GMAIL_API_REFRESH_TOKEN = os.getenv('GMAIL_API_REFRESH_TOKEN', '')
@@ -239,6 +258,13 @@ SWAGGER_SETTINGS = {
     'TAGS_SORTER': 'alpha',  # Сортировка тегов (alpha, order)
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://redis:6379/3'),
+    }
+}
+
 CELERY_BROKER_URL = 'redis://redis:6379/1'
 CELERY_RESULT_BACKEND = 'redis://redis:6379/2'
 
@@ -247,8 +273,30 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'users.tasks.delete_not_active_users',
         'schedule': crontab(hour=20, minute=45),
     },
+    'refresh_platform_about_cache': {
+        'task': 'api.tasks.refresh_platform_about_cache',
+        'schedule': crontab(minute='*/10'),
+    },
+    'send_notifications': {
+        'task': 'notifications.tasks.send_notifications',
+        'schedule': crontab(),
+    },
 }
 
+NOTIFICATIONS_BATCH_SIZE = 100
+NOTIFICATIONS_MAX_ATTEMPTS = 5
+NOTIFICATIONS_RETRY_DELAY = 60
+NOTIFICATIONS_SEND_CHUNK = 50
+# Через сколько секунд уведомление в статусе "Отправляется" считается
+# брошенным упавшим воркером и забирается повторно
+NOTIFICATIONS_CLAIM_TIMEOUT = 15 * 60
+NOTIFICATIONS_RATE_LIMIT = float(os.getenv('NOTIFICATIONS_RATE_LIMIT', 2))
+NOTIFICATIONS_RATE_BURST = 20
+NOTIFICATIONS_RATE_LIMIT_TIMEOUT = 10
+NOTIFICATIONS_RATE_LIMIT_URL = os.getenv(
+    'REDIS_CACHE_URL', 'redis://redis:6379/3'
+)
+
 # Constants
 # MAX_LENGTH_NAME = 50
 MAX_LENGTH_SLUG = 50
@@ -309,6 +357,31 @@ TELEGRAM_ERROR_MESSAGE = (
 )
 
 VALUATIONS_ON_PAGE_ABOUT_US = 4
+PLATFORM_ABOUT_CACHE_TIMEOUT = 60 * 60
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_CACHE_MAX_AGE = 60 * 5
+MAX_INCOMES_BULK = 300
+# raise - исключение при превышении бюджета SQL запросов представления,
+# log - предупреждение для доли QUERY_BUDGET_SAMPLE_RATE превышений,
+# off - проверка отключена. Тесты всегда идут в режиме raise (TEST_RUNNER)
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'raise' if DEBUG else 'log')
+QUERY_BUDGET_SAMPLE_RATE = float(os.getenv('QUERY_BUDGET_SAMPLE_RATE', 0.1))
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+# Профилирование запросов, по умолчанию выключено. Заголовок Server-Timing
+# получают только администраторы (is_staff), выборка запросов попадает в
+# кольцевой буфер в кеше, записи доступны администраторам по адресу
+# /api/profiling/
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'FALSE').upper() == 'TRUE'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_BUFFER_SIZE = 500
+PROFILING_BUFFER_TIMEOUT = 60 * 60 * 24
+# Уменьшенные варианты загруженных изображений: наибольшая сторона
+# в пикселях для каждого размера и форматы файлов
+IMAGE_VARIANT_SIZES = {'thumbnail': 160, 'card': 480, 'full': 1280}
+IMAGE_VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+IMAGE_VARIANT_QUALITY = 80
+# Порт, на котором воркер Celery отдает метрики Prometheus (0 - не отдавать)
+CELERY_METRICS_PORT = int(os.getenv('CELERY_METRICS_PORT', 9808))
 
 
 MIN_LEN_TEXT_FIELD_V1 = 2
@@ -322,6 +395,9 @@ MESSAGE_ABOUT_US_VALID = (
 )
 MESSAGE_ABOUT_US_REGEX_VALID = """Допускаются цифры, буквы, пробелы и спецсимволы: %% №\\!#$&*'+/=?^_;():@,.<>`{|}[]~-«»"""
 
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_LIMIT = 5
+
 MAX_LEN_PHOTOS = 10
 MIN_LEN_COVER_LETTER = 10
 MAX_LEN_COVER_LETTER = 530
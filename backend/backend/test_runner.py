@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Запускает тесты с проверкой бюджета SQL запросов в режиме raise:
+    превышение в любом тесте должно его ронять, независимо от DEBUG и
+    переменных окружения.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_MODE = 'raise'
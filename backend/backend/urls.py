@@ -6,11 +6,13 @@ from django.urls import include, path
 
 # from rest_framework_swagger.views import get_swagger_view
 # schema_view = get_swagger_view(title='BETTER-TOGETHER Documentation API')
+from .metrics import metrics_view
 from .yasg import urlpatterns as doc_urls
 
 urlpatterns = [
     path('api/', include('api.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),
     #  логин в джанго свагер Проверить никому не помешает ли!!!
     path('accounts/login/', LoginView.as_view(
         template_name='admin/login.html',
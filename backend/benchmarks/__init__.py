@@ -0,0 +1,8 @@
+"""
+Нагрузочное тестирование API.
+
+Сценарии пользователей (journeys) выполняются в несколько потоков
+внутри процесса Django или по HTTP против запущенного сервера,
+результаты сохраняются в JSON для сравнения между коммитами.
+Запуск: python manage.py benchmark_api --help
+"""
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from time import perf_counter
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class Result:
+    """
+    Результат одного запроса сценария.
+    """
+
+    name: str
+    status: int
+    seconds: float
+    queries: int = None
+    data: object = None
+
+
+class InProcessClient:
+    """
+    Выполняет запросы через WSGI обработчик Django в текущем потоке и
+    считает SQL запросы, выполненные при обработке каждого запроса.
+    """
+
+    def __init__(self, record, token=None):
+        self.record = record
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost',
+        )
+        self.client = Client(HTTP_HOST=host.lstrip('.'))
+        self.headers = {}
+        if token:
+            self.headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+
+    def request(self, name, method, path, data=None):
+        send = getattr(self.client, method)
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            if data is None:
+                response = send(path, **self.headers)
+            else:
+                response = send(
+                    path,
+                    data,
+                    content_type='application/json',
+                    **self.headers,
+                )
+            seconds = perf_counter() - start
+        return self.record(Result(
+            name,
+            response.status_code,
+            seconds,
+            len(queries),
+            response.json() if is_json(response) else None,
+        ))
+
+
+class HttpClient:
+    """
+    Выполняет запросы по HTTP к запущенному серверу. Количество SQL
+    запросов в этом режиме неизвестно.
+    """
+
+    def __init__(self, record, base_url, token=None):
+        self.record = record
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+
+    def request(self, name, method, path, data=None):
+        start = perf_counter()
+        response = self.session.request(
+            method, f'{self.base_url}{path}', json=data, timeout=30
+        )
+        seconds = perf_counter() - start
+        return self.record(Result(
+            name,
+            response.status_code,
+            seconds,
+            data=response.json() if is_json(response) else None,
+        ))
+
+
+def is_json(response):
+    return response.headers.get('Content-Type', '').startswith(
+        'application/json'
+    )
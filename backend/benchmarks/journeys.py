@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+
+from rest_framework.authtoken.models import Token
+
+from projects.models import Project, ProjectIncomes
+from users.models import User
+
+
+@dataclass
+class Fixtures:
+    """
+    Данные из базы, на которых строятся сценарии.
+    """
+
+    project_ids: list
+    open_project_ids: list
+    volunteer_tokens: list
+    organizer_tokens: list
+    search_terms: list = field(default_factory=list)
+
+
+def load_fixtures(limit=200):
+    """
+    Выбирает проекты и пользователей для сценариев и выдает токены
+    волонтерам и организаторам, у которых их еще нет.
+    """
+    projects = Project.objects.filter(status_approve=Project.APPROVED)
+    open_project_ids = list(
+        projects.with_status()
+        .filter(status=Project.READY_FOR_FEEDBACK)
+        .values_list('pk', flat=True)[:limit]
+    )
+    volunteers = User.objects.filter(
+        role=User.VOLUNTEER, volunteers__isnull=False, is_active=True
+    )[:limit]
+    organizers = User.objects.filter(
+        role=User.ORGANIZER,
+        organization__projects__project_incomes__isnull=False,
+        is_active=True,
+    ).distinct()[:limit]
+    names = projects.values_list('name', flat=True)[:limit]
+    return Fixtures(
+        project_ids=list(projects.values_list('pk', flat=True)[:limit]),
+        open_project_ids=open_project_ids,
+        volunteer_tokens=[
+            Token.objects.get_or_create(user=user)[0].key
+            for user in volunteers
+        ],
+        organizer_tokens=[
+            Token.objects.get_or_create(user=user)[0].key
+            for user in organizers
+        ],
+        search_terms=sorted({name.split()[0] for name in names}),
+    )
+
+
+def anonymous_browse(client, fixtures, random):
+    """
+    Аноним листает каталог, ищет и открывает карточки проектов.
+    """
+    client.request(
+        'GET /api/projects/', 'get', '/api/projects/?limit=20'
+    )
+    client.request(
+        'GET /api/projects/?status=',
+        'get',
+        '/api/projects/?status=ready_for_feedback&limit=20',
+    )
+    if fixtures.search_terms:
+        term = random.choice(fixtures.search_terms)
+        client.request(
+            'GET /api/search/', 'get', f'/api/search/?search={term}'
+        )
+    for project_id in random.sample(
+        fixtures.project_ids, min(2, len(fixtures.project_ids))
+    ):
+        client.request(
+            'GET /api/projects/{id}/', 'get', f'/api/projects/{project_id}/'
+        )
+
+
+def volunteer_apply(client, fixtures, random):
+    """
+    Волонтер выбирает открытый проект, подает заявку и смотрит
+    свой кабинет.
+    """
+    client.request(
+        'GET /api/projects/?status=',
+        'get',
+        '/api/projects/?status=ready_for_feedback&limit=20',
+    )
+    if fixtures.open_project_ids:
+        project_id = random.choice(fixtures.open_project_ids)
+        client.request(
+            'GET /api/projects/{id}/', 'get', f'/api/projects/{project_id}/'
+        )
+        client.request('POST /api/incomes/', 'post', '/api/incomes/', {
+            'project': project_id,
+            'cover_letter': 'Хочу помочь проекту, есть свободное время.',
+        })
+    client.request('GET /api/incomes/', 'get', '/api/incomes/')
+    client.request('GET /api/projects/me/', 'get', '/api/projects/me/')
+    client.request(
+        'GET /api/projects/me/counts/', 'get', '/api/projects/me/counts/'
+    )
+
+
+def organizer_review(client, fixtures, random):
+    """
+    Организатор просматривает заявки и принимает или отклоняет
+    поданные.
+    """
+    client.request('GET /api/projects/me/', 'get', '/api/projects/me/')
+    result = client.request(
+        'GET /api/incomes/', 'get', '/api/incomes/?limit=20'
+    )
+    incomes = (result.data or {}).get('results', [])
+    submitted = [
+        income['id'] for income in incomes
+        if income['status_incomes'] == ProjectIncomes.APPLICATION_SUBMITTED
+    ]
+    if not submitted:
+        return
+    income_id = random.choice(submitted)
+    if random.random() < 0.7:
+        client.request(
+            'POST /api/incomes/{id}/accept_incomes/',
+            'post',
+            f'/api/incomes/{income_id}/accept_incomes/',
+        )
+    else:
+        client.request(
+            'PUT /api/incomes/{id}/reject_incomes/',
+            'put',
+            f'/api/incomes/{income_id}/reject_incomes/',
+        )
+
+
+# Сценарий: (функция, пул токенов из Fixtures или None для анонима)
+JOURNEYS = {
+    'anonymous': (anonymous_browse, None),
+    'volunteer': (volunteer_apply, 'volunteer_tokens'),
+    'organizer': (organizer_review, 'organizer_tokens'),
+}
@@ -0,0 +1,160 @@
+import threading
+from collections import defaultdict
+from random import Random
+from time import monotonic
+
+from django.db import connection
+
+from api.profiling import percentile
+
+from .journeys import JOURNEYS
+
+
+class Recorder:
+    """
+    Потокобезопасно собирает результаты запросов по именам эндпоинтов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = defaultdict(list)
+        self.journeys = defaultdict(int)
+
+    def __call__(self, result):
+        with self.lock:
+            self.results[result.name].append(result)
+        return result
+
+    def finish_journey(self, name):
+        with self.lock:
+            self.journeys[name] += 1
+
+    def summarize_results(self, results, seconds):
+        latencies = sorted(result.seconds * 1000 for result in results)
+        queries = [
+            result.queries for result in results
+            if result.queries is not None
+        ]
+        statuses = defaultdict(int)
+        for result in results:
+            statuses[str(result.status)] += 1
+        return {
+            'requests': len(results),
+            'errors': sum(1 for result in results if result.status >= 500),
+            'statuses': dict(sorted(statuses.items())),
+            'throughput': round(len(results) / seconds, 2),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2),
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'max': round(latencies[-1], 2),
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            } if queries else None,
+        }
+
+    def summarize(self, seconds):
+        endpoints = {
+            name: self.summarize_results(results, seconds)
+            for name, results in sorted(self.results.items())
+        }
+        everything = [
+            result for results in self.results.values() for result in results
+        ]
+        return {
+            'seconds': round(seconds, 2),
+            'journeys': dict(self.journeys),
+            'total': (
+                self.summarize_results(everything, seconds)
+                if everything else None
+            ),
+            'endpoints': endpoints,
+        }
+
+
+def run_user(recorder, make_client, fixtures, journeys, deadline, seed):
+    """
+    Виртуальный пользователь: до окончания замера выполняет случайные
+    сценарии из journeys от имени случайного пользователя своей роли.
+    """
+    random = Random(seed)
+    try:
+        while monotonic() < deadline:
+            name = random.choice(journeys)
+            journey, tokens = JOURNEYS[name]
+            tokens = getattr(fixtures, tokens) if tokens else [None]
+            if not tokens:
+                continue
+            client = make_client(recorder, random.choice(tokens))
+            journey(client, fixtures, random)
+            recorder.finish_journey(name)
+    finally:
+        # У каждого потока свое соединение с БД
+        connection.close()
+
+
+def run_load(make_client, fixtures, journeys, users, duration, seed=None):
+    """
+    Запускает users потоков на duration секунд и возвращает сводку.
+    """
+    for name in journeys:
+        _, tokens = JOURNEYS[name]
+        if tokens and not getattr(fixtures, tokens):
+            raise ValueError(f'No users with data for journey {name}')
+    recorder = Recorder()
+    started = monotonic()
+    deadline = started + duration
+    threads = [
+        threading.Thread(
+            target=run_user,
+            args=(
+                recorder,
+                make_client,
+                fixtures,
+                journeys,
+                deadline,
+                None if seed is None else seed + index,
+            ),
+        )
+        for index in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.summarize(monotonic() - started)
+
+
+def compare(before, after):
+    """
+    Изменения p95, пропускной способности и числа SQL запросов
+    по эндпоинтам между двумя сохраненными результатами.
+    """
+    rows = []
+    for name, current in after['endpoints'].items():
+        previous = before['endpoints'].get(name)
+        if previous is None:
+            continue
+        rows.append({
+            'endpoint': name,
+            'p95_before': previous['latency_ms']['p95'],
+            'p95_after': current['latency_ms']['p95'],
+            'p95_change': change(
+                previous['latency_ms']['p95'], current['latency_ms']['p95']
+            ),
+            'throughput_change': change(
+                previous['throughput'], current['throughput']
+            ),
+            'queries_before': (previous['queries'] or {}).get('mean'),
+            'queries_after': (current['queries'] or {}).get('mean'),
+        })
+    return rows
+
+
+def change(before, after):
+    if not before:
+        return None
+    return round((after - before) / before * 100, 1)
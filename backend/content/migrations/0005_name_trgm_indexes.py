@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:36
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_alter_valuation_title'),
+        ('taggit', '0005_auto_20220424_2025'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='city',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='city_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skills',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='skills_name_trgm_idx'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX taggit_tag_name_trgm_idx ON taggit_tag '
+            'USING gin (UPPER(name) gin_trgm_ops);',
+            'DROP INDEX IF EXISTS taggit_tag_name_trgm_idx;',
+        ),
+    ]
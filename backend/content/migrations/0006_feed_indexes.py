@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_name_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-created_at'], name='news_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные варианты картинки'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from taggit.managers import TaggableManager
 
 from users.models import User
@@ -99,6 +101,12 @@ class News(models.Model):
     """
 
     picture = models.ImageField(upload_to='news/%Y/%m/%d/', blank=True)
+    picture_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные варианты картинки',
+    )
     title = models.CharField(
         verbose_name='Заголовок',
         max_length=settings.MAX_LEN_CHAR,
@@ -117,6 +125,9 @@ class News(models.Model):
 
     class Meta:
         ordering = ('-created_at',)
+        indexes = (
+            models.Index(fields=('-created_at',), name='news_created_at_idx'),
+        )
         verbose_name = 'Новость'
         verbose_name_plural = 'Новости'
 
@@ -141,6 +152,12 @@ class City(models.Model):
 
     class Meta:
         ordering = ('name',)
+        indexes = (
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='city_name_trgm_idx',
+            ),
+        )
         verbose_name = 'Город'
         verbose_name_plural = 'Города'
 
@@ -161,6 +178,12 @@ class Skills(models.Model):
 
     class Meta:
         ordering = ('name',)
+        indexes = (
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='skills_name_trgm_idx',
+            ),
+        )
         verbose_name = 'Навык'
         verbose_name_plural = 'Навыки'
 
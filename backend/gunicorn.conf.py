@@ -0,0 +1,9 @@
+from backend.metrics import clear_multiprocess_dir, mark_process_dead
+
+
+def on_starting(server):
+    clear_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
@@ -1,3 +1,33 @@
-# from django.contrib import admin
+from django.contrib import admin
 
-# Register your models here.
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """
+    Администрирование исходящих уведомлений.
+    """
+
+    list_display = (
+        'kind',
+        'user',
+        'project',
+        'status',
+        'attempts',
+        'created_at',
+        'sent_at',
+    )
+    readonly_fields = (
+        'kind',
+        'user',
+        'project',
+        'context',
+        'attempts',
+        'error',
+        'created_at',
+        'sent_at',
+    )
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('user__email', 'project__name')
+    date_hierarchy = 'created_at'
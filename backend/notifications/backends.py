@@ -0,0 +1,43 @@
+from gmailapi_backend.mail import GmailBackend as BaseGmailBackend
+
+
+class GmailBackend(BaseGmailBackend):
+    """
+    Бэкенд GMail API, который сохраняет результат отправки каждого
+    письма пачки в атрибуте send_error (None при успехе).
+
+    Стандартный бэкенд отправляет пачку одним batch-запросом, но при
+    ошибке сообщает только последнее исключение, и нельзя понять,
+    какие письма ушли.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        # Письма, по которым еще нет результата: {request_id: письмо}
+        pending = {}
+        for index, message in enumerate(email_messages):
+            message.send_error = None
+            if message.recipients():
+                pending[str(index)] = message
+
+        def send_callback(request_id, response, exception):
+            pending.pop(request_id).send_error = exception
+
+        try:
+            batch = self.service.new_batch_http_request(send_callback)
+            for request_id, message in pending.items():
+                batch.add(self.send_message(message), request_id=request_id)
+            batch.execute()
+        except Exception as error:
+            # Сбой всего запроса (обновление токена OAuth, сеть): письма
+            # без результата не отправлены и должны быть повторены
+            for message in pending.values():
+                message.send_error = error
+        errors = [
+            message.send_error for message in email_messages
+            if message.send_error is not None
+        ]
+        if errors and not self.fail_silently:
+            raise errors[-1]
+        return len(email_messages) - len(errors)
@@ -1,8 +1,61 @@
 from templated_mail.mail import BaseEmailMessage
 
+from .rendering import get_compiled_template
 
-class IncomesApproveEmail(BaseEmailMessage):
+
+class CachedEmailMessage(BaseEmailMessage):
+    """
+    Письмо templated_mail с кешем разобранного шаблона.
+
+    Переменные из recipient_variables различаются у получателей,
+    остальной контекст общий для пачки писем: блоки, которые от
+    переменных получателя не зависят, при render_batch рендерятся
+    один раз на всю пачку.
+    """
+
+    recipient_variables = ('user',)
+
+    @classmethod
+    def get_compiled_template(cls):
+        return get_compiled_template(
+            cls.template_name, cls._node_map, cls.recipient_variables
+        )
+
+    def render(self, shared=None):
+        template = self.get_compiled_template()
+        context = self.get_context_data()
+        if shared is None:
+            shared = template.render_shared(context, self.request)
+        rendered = template.render(context, shared, self.request)
+        for attr, value in rendered.items():
+            setattr(self, attr, value)
+        self._attach_body()
+
+    @classmethod
+    def render_batch(cls, shared_context, recipient_contexts, **kwargs):
+        """
+        Собирает письма для списка получателей с общим контекстом.
+
+        recipient_contexts - контексты с переменными получателя,
+        остальные значения берутся из shared_context.
+        """
+        messages = [
+            cls(context=dict(shared_context, **context), **kwargs)
+            for context in recipient_contexts
+        ]
+        if not messages:
+            return messages
+        shared = cls.get_compiled_template().render_shared(
+            messages[0].get_context_data(), messages[0].request
+        )
+        for message in messages:
+            message.render(shared)
+        return messages
+
+
+class IncomesApproveEmail(CachedEmailMessage):
     template_name = 'email/incomes_approve.html'
+    recipient_variables = ('user', 'date_time')
 
     def get_context_data(self):
         context = super().get_context_data()
@@ -0,0 +1,79 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from templated_mail.mail import BaseEmailMessage
+
+from notifications.email import IncomesApproveEmail
+from projects.models import Project
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rendering personalised notification emails through '
+        'templated_mail against the cached batch renderer. '
+        'Nothing is written to the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000)
+
+    def get_contexts(self, count):
+        now = timezone.now()
+        return [
+            {
+                'user': User(
+                    email=f'user{index}@example.com',
+                    first_name=f'Имя{index}',
+                    last_name=f'Фамилия{index}',
+                ),
+                'date_time': now,
+            }
+            for index in range(count)
+        ]
+
+    def render_plain(self, shared_context, contexts):
+        """
+        Прежняя схема: шаблон загружается и рендерится целиком
+        для каждого письма.
+        """
+        messages = []
+        for context in contexts:
+            message = IncomesApproveEmail(
+                context=dict(shared_context, **context)
+            )
+            BaseEmailMessage.render(message)
+            messages.append(message)
+        return messages
+
+    def render_batch(self, shared_context, contexts):
+        return IncomesApproveEmail.render_batch(shared_context, contexts)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        shared_context = {
+            'project': Project(name='Проект для замера'),
+            'domain': 'localhost',
+            'protocol': 'http',
+            'site_name': 'localhost',
+        }
+        contexts = self.get_contexts(count)
+        results = {}
+        for name, render in (
+            ('templated_mail', self.render_plain),
+            ('cached batch', self.render_batch),
+        ):
+            start = perf_counter()
+            messages = render(shared_context, contexts)
+            seconds = perf_counter() - start
+            results[name] = [
+                (message.subject, message.body, message.html)
+                for message in messages
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {count} emails in {seconds:.2f} s, '
+                f'{count / seconds:.1f} emails/s'
+            ))
+        if results['templated_mail'] != results['cached batch']:
+            self.stdout.write(self.style.ERROR('Rendered emails differ'))
@@ -0,0 +1,92 @@
+from itertools import cycle
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from notifications.models import Notification
+from notifications.tasks import build_message, send_notifications
+from projects.models import Project
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare sending notifications one connection per email against '
+        'the batched outbox sender. Created rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000)
+        parser.add_argument(
+            '--backend',
+            default='django.core.mail.backends.locmem.EmailBackend',
+            help='Email backend, e.g. console, filebased or locmem',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=0,
+            help='Emails per second for the token bucket (0 - no limit)',
+        )
+
+    def create_notifications(self, count):
+        users = list(User.objects.filter(is_active=True)[:100])
+        project = Project.objects.first()
+        if not users or project is None:
+            raise CommandError('Load data first: need users and a project')
+        return Notification.objects.bulk_create(
+            Notification(
+                kind=Notification.INCOMES_APPROVE,
+                user=user,
+                project=project,
+                context={'domain': 'localhost', 'protocol': 'http'},
+            )
+            for user, _ in zip(cycle(users), range(count))
+        )
+
+    def send_one_by_one(self, notifications, backend):
+        """
+        Прежняя схема: новое соединение бэкенда на каждое письмо.
+        """
+        for notification in notifications:
+            # Письмо уже собрано, отправляем его без повторного рендеринга
+            EmailMultiAlternatives.send(
+                build_message(notification, get_connection(backend))
+            )
+
+    def report(self, name, count, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{name}: {count} emails in {seconds:.2f} s, '
+            f'{count / seconds:.1f} emails/s'
+        ))
+
+    def handle(self, *args, **options):
+        count = options['count']
+        with transaction.atomic():
+            ids = [
+                notification.pk
+                for notification in self.create_notifications(count)
+            ]
+            notifications = list(
+                Notification.objects.filter(pk__in=ids)
+                .select_related('user', 'project')
+            )
+            start = perf_counter()
+            self.send_one_by_one(notifications, options['backend'])
+            self.report('one by one', count, perf_counter() - start)
+
+            with override_settings(
+                EMAIL_BACKEND=options['backend'],
+                NOTIFICATIONS_RATE_LIMIT=options['rate'],
+            ):
+                start = perf_counter()
+                # Очередь не трогаем: чужие уведомления ушли бы реальным
+                # пользователям, а после отката - еще раз
+                sent = send_notifications(ids)
+                self.report('batched', sent, perf_counter() - start)
+            transaction.set_rollback(True)
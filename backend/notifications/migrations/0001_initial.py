@@ -0,0 +1,41 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('projects', '0010_project_participants_limit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('incomes_approve', 'Заявка принята'), ('incomes_reject', 'Заявка отклонена')], max_length=50, verbose_name='Вид уведомления')),
+                ('context', models.JSONField(blank=True, default=dict, verbose_name='Данные сайта для письма')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Ошибка отправки')], default='pending', max_length=20, verbose_name='Статус отправки')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')),
+                ('error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата и время следующей попытки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата и время создания')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата и время отправки')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='projects.project', verbose_name='Проект')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Получатель')),
+            ],
+            options={
+                'verbose_name': 'Уведомление',
+                'verbose_name_plural': 'Уведомления',
+                'ordering': ('-created_at',),
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='notification_pending_idx')],
+            },
+        ),
+    ]
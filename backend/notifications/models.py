@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class Notification(models.Model):
+    """
+    Исходящее уведомление (outbox).
+
+    Запись создается в одной транзакции с изменением, о котором
+    уведомляет, и отправляется задачей notifications.tasks.
+    send_notifications.
+    """
+
+    INCOMES_APPROVE = 'incomes_approve'
+    INCOMES_REJECT = 'incomes_reject'
+    KIND_CHOICES = [
+        (INCOMES_APPROVE, 'Заявка принята'),
+        (INCOMES_REJECT, 'Заявка отклонена'),
+    ]
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка отправки'),
+    ]
+
+    kind = models.CharField(
+        verbose_name='Вид уведомления',
+        max_length=50,
+        choices=KIND_CHOICES,
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name='Получатель',
+        on_delete=models.CASCADE,
+        related_name='notifications',
+    )
+    project = models.ForeignKey(
+        'projects.Project',
+        verbose_name='Проект',
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        null=True,
+        blank=True,
+    )
+    context = models.JSONField(
+        verbose_name='Данные сайта для письма', default=dict, blank=True
+    )
+    status = models.CharField(
+        verbose_name='Статус отправки',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки', default=0
+    )
+    error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Дата и время следующей попытки', default=timezone.now
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата и время создания', auto_now_add=True
+    )
+    sent_at = models.DateTimeField(
+        verbose_name='Дата и время отправки', null=True, blank=True
+    )
+    claimed_at = models.DateTimeField(
+        verbose_name='Дата и время начала отправки', null=True, blank=True
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('next_attempt_at',),
+                condition=models.Q(status='pending'),
+                name='notification_pending_idx',
+            ),
+            models.Index(
+                fields=('claimed_at',),
+                condition=models.Q(status='sending'),
+                name='notification_sending_idx',
+            ),
+        )
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.user}'
@@ -0,0 +1,70 @@
+import time
+
+import redis
+from django.conf import settings
+
+# Токены пополняются по времени сервера Redis, поэтому ведро общее для
+# всех воркеров независимо от их часов.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+local granted = math.min(requested, math.floor(tokens))
+redis.call('HSET', KEYS[1], 'tokens', tokens - granted, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return granted
+"""
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты отправки писем (token bucket) в Redis.
+
+    rate - токенов в секунду, capacity - максимальный запас токенов
+    (допустимый всплеск). При rate=None ограничение отключено.
+    """
+
+    def __init__(self, key, rate, capacity, url=None):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        if rate:
+            client = redis.Redis.from_url(url)
+            self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def take(self, count):
+        """
+        Забирает до count токенов без ожидания, возвращает их количество.
+        """
+        if not self.rate:
+            return count
+        return int(self.script(
+            keys=[self.key], args=[self.rate, self.capacity, count]
+        ))
+
+    def acquire(self, count, timeout):
+        """
+        Ждет хотя бы один токен не дольше timeout секунд и забирает до
+        count токенов. Возвращает 0, если токенов так и не появилось.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            granted = self.take(count)
+            if granted or time.monotonic() >= deadline:
+                return granted
+            time.sleep(1 / self.rate)
+
+
+def get_email_bucket():
+    return TokenBucket(
+        'notifications:email_bucket',
+        rate=settings.NOTIFICATIONS_RATE_LIMIT,
+        capacity=settings.NOTIFICATIONS_RATE_BURST,
+        url=settings.NOTIFICATIONS_RATE_LIMIT_URL,
+    )
@@ -0,0 +1,157 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.base import TextNode, TokenType, VariableNode
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.template.loader_tags import BlockNode, ExtendsNode
+from django.templatetags.i18n import BlockTranslateNode, TranslateNode
+
+
+def _expression_variables(expression):
+    """
+    Корневые имена переменных выражения {{ var|filter:arg }}.
+    """
+    names = set()
+    variables = [expression.var] + [
+        arg for _, args in expression.filters for _, arg in args
+    ]
+    for variable in variables:
+        lookups = getattr(variable, 'lookups', None)
+        if lookups:
+            names.add(lookups[0])
+    return names
+
+
+def _node_variables(node):
+    """
+    Имена переменных, от которых зависит вывод узла шаблона.
+
+    Возвращает None для тегов, зависимости которых не разбираются
+    (if, for и т.д.): такой узел считается персональным.
+    """
+    if isinstance(node, TextNode):
+        return set()
+    if isinstance(node, (VariableNode, TranslateNode)):
+        return _expression_variables(node.filter_expression)
+    if isinstance(node, BlockTranslateNode):
+        names = set()
+        if node.counter is not None:
+            names |= _expression_variables(node.counter)
+        for expression in node.extra_context.values():
+            names |= _expression_variables(expression)
+        for token in node.singular + (node.plural or []):
+            if token.token_type == TokenType.VAR:
+                names.add(token.contents.split('.')[0])
+        return names
+    return None
+
+
+class CompiledEmailTemplate:
+    """
+    Разобранный шаблон письма templated_mail.
+
+    Узлы блоков subject, text_body и html_body делятся на общие, не
+    зависящие от переменных получателя, и персональные. Общие узлы
+    рендерятся один раз на пачку писем, для каждого получателя
+    рендерятся только персональные, например приветствие по имени.
+
+    Блоки ищутся только на верхнем уровне шаблона, как в templated_mail:
+    шаблоны с {% extends %} не поддерживаются, иначе письмо вышло бы
+    пустым без всякой ошибки.
+    """
+
+    def __init__(self, template_name, node_map, recipient_variables):
+        self.template = get_template(template_name).template
+        if any(
+            isinstance(node, ExtendsNode) for node in self.template.nodelist
+        ):
+            raise ImproperlyConfigured(
+                f'Email template {template_name} uses {{% extends %}}, '
+                f'blocks {", ".join(node_map)} must be defined in the '
+                f'template itself.'
+            )
+        self.blocks = {}
+        recipient_variables = set(recipient_variables)
+        for block in self.template.nodelist:
+            if not isinstance(block, BlockNode) or block.name not in node_map:
+                continue
+            nodes = []
+            for node in block.nodelist:
+                names = _node_variables(node)
+                shared = names is not None and not names & recipient_variables
+                nodes.append((node, shared))
+            self.blocks[node_map[block.name]] = nodes
+        if not self.blocks:
+            raise ImproperlyConfigured(
+                f'Email template {template_name} defines none of the '
+                f'blocks {", ".join(node_map)}.'
+            )
+
+    def _render(self, context, request, render_node):
+        context = make_context(context, request=request)
+        with context.bind_template(self.template):
+            return {
+                attr: [render_node(node, shared, context)
+                       for node, shared in nodes]
+                for attr, nodes in self.blocks.items()
+            }
+
+    def render_shared(self, context, request=None):
+        """
+        Рендерит общие узлы, на месте персональных остается None.
+        """
+        return self._render(
+            context,
+            request,
+            lambda node, shared, context: (
+                node.render_annotated(context) if shared else None
+            ),
+        )
+
+    def render(self, context, shared, request=None):
+        """
+        Рендерит персональные узлы и собирает текст блоков письма.
+        """
+        rendered = self._render(
+            context,
+            request,
+            lambda node, shared, context: (
+                None if shared else node.render_annotated(context)
+            ),
+        )
+        return {
+            attr: ''.join(
+                str(part) if part is not None else str(shared[attr][index])
+                for index, part in enumerate(parts)
+            ).strip()
+            for attr, parts in rendered.items()
+        }
+
+
+@lru_cache(maxsize=None)
+def _get_compiled_template(template_name, node_map, recipient_variables):
+    return CompiledEmailTemplate(
+        template_name, dict(node_map), recipient_variables
+    )
+
+
+def get_compiled_template(template_name, node_map, recipient_variables):
+    """
+    Возвращает разобранный шаблон письма.
+
+    Шаблон загружается и анализируется один раз на процесс, в режиме
+    DEBUG кеш не используется, чтобы правки шаблонов подхватывались
+    без перезапуска.
+    """
+    args = (
+        template_name,
+        tuple(sorted(node_map.items())),
+        tuple(sorted(recipient_variables)),
+    )
+    if settings.DEBUG:
+        return CompiledEmailTemplate(
+            template_name, node_map, recipient_variables
+        )
+    return _get_compiled_template(*args)
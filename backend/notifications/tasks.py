@@ -1,38 +1,268 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+from time import monotonic
+
 from celery import shared_task
-from django.contrib.auth import get_user_model
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from djoser.compat import get_user_email
 
+from backend.metrics import EMAILS
+
 from .email import IncomesApproveEmail, IncomesRejectEmail
+from .models import Notification
+from .ratelimit import get_email_bucket
 
-User = get_user_model()
+logger = get_task_logger(__name__)
 
+EMAIL_CLASSES = {
+    Notification.INCOMES_APPROVE: IncomesApproveEmail,
+    Notification.INCOMES_REJECT: IncomesRejectEmail,
+}
+METRICS_CACHE_KEY = 'notifications:metrics'
 
-@shared_task
-def incomes_approve_send_email(instance_pk, ctx):
-    from projects.models import ProjectParticipants  # noqa
-    date_time = timezone.now()
-    instance = ProjectParticipants.objects.filter(
-        pk=instance_pk).select_related('volunteer__user', 'project').first()
-    ctx.update({
-        'user': instance.volunteer.user,
-        'project': instance.project,
-        'date_time': date_time,
-    })
-    to = [get_user_email(instance.volunteer.user)]
-    IncomesApproveEmail(context=ctx).send(to)
+
+def enqueue_notifications(notifications):
+    """
+    Сохраняет уведомления в текущей транзакции и запускает их отправку
+    после ее фиксации.
+    """
+    if not notifications:
+        return
+    Notification.objects.bulk_create(notifications)
+    transaction.on_commit(send_notifications.delay)
+
+
+def prepare_message(message, notification, connection=None):
+    message.to = [get_user_email(notification.user)]
+    message.from_email = settings.DEFAULT_FROM_EMAIL
+    message.connection = connection
+    return message
+
+
+def build_message(notification, connection=None):
+    """
+    Собирает письмо уведомления, не отправляя его.
+    """
+    email_class = EMAIL_CLASSES[notification.kind]
+    message = email_class(context=dict(
+        notification.context,
+        user=notification.user,
+        project=notification.project,
+        date_time=notification.created_at,
+    ))
+    message.render()
+    return prepare_message(message, notification, connection)
+
+
+def build_messages(notifications, connection=None):
+    """
+    Собирает письма для пачки уведомлений.
+
+    Уведомления группируются по виду, проекту и контексту сайта, общие
+    блоки шаблона рендерятся один раз на группу. Возвращает пары
+    (уведомление, письмо) и (уведомление, ошибка) для групп, которые
+    не удалось собрать.
+    """
+    groups = defaultdict(list)
+    for notification in notifications:
+        key = (
+            notification.kind,
+            notification.project_id,
+            json.dumps(notification.context, sort_keys=True),
+        )
+        groups[key].append(notification)
+    built, errors = [], []
+    for group in groups.values():
+        first = group[0]
+        try:
+            messages = EMAIL_CLASSES[first.kind].render_batch(
+                dict(first.context, project=first.project),
+                [
+                    {
+                        'user': notification.user,
+                        'date_time': notification.created_at,
+                    }
+                    for notification in group
+                ],
+            )
+            built.extend(
+                (notification, prepare_message(
+                    message, notification, connection
+                ))
+                for notification, message in zip(group, messages)
+            )
+        except Exception as error:
+            errors.extend((notification, error) for notification in group)
+    return built, errors
+
+
+def deliver(connection, messages):
+    """
+    Отправляет письма одним вызовом send_messages и возвращает ошибку
+    (или None) для каждого письма.
+
+    Если бэкенд не сообщает результат по каждому письму, ошибка
+    считается общей для всей пачки.
+    """
+    try:
+        connection.send_messages(messages)
+    except Exception as error:
+        return [getattr(message, 'send_error', error) for message in messages]
+    return [getattr(message, 'send_error', None) for message in messages]
+
+
+def claim_notifications(size, ids=None):
+    """
+    Забирает до size уведомлений к отправке (только из ids, если заданы).
+
+    Строки выбираются через SELECT ... FOR UPDATE SKIP LOCKED и в той же
+    короткой транзакции переводятся в статус SENDING, поэтому несколько
+    воркеров разбирают очередь параллельно, не пересекаясь, а сама
+    отправка идет без блокировок. Уведомления, оставшиеся в SENDING
+    дольше NOTIFICATIONS_CLAIM_TIMEOUT (воркер упал во время отправки),
+    забираются повторно.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.NOTIFICATIONS_CLAIM_TIMEOUT)
+    notifications = Notification.objects.all()
+    if ids is not None:
+        notifications = notifications.filter(pk__in=ids)
+    with transaction.atomic():
+        claimed = list(
+            notifications.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Notification.PENDING, next_attempt_at__lte=now)
+                | Q(status=Notification.SENDING, claimed_at__lte=stale)
+            )
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:size]
+        )
+        Notification.objects.filter(pk__in=claimed).update(
+            status=Notification.SENDING, claimed_at=now
+        )
+    return list(
+        Notification.objects.filter(pk__in=claimed)
+        .select_related('user', 'project')
+        .order_by('next_attempt_at')
+    )
+
+
+def save_results(results):
+    """
+    Сохраняет результаты отправки: неудачные попытки откладываются с
+    растущей задержкой. Возвращает количество отправленных и неудачных.
+    """
+    sent, failed = [], []
+    for notification, error in results:
+        if error is None:
+            sent.append(notification.pk)
+            continue
+        notification.attempts += 1
+        notification.error = repr(error)
+        if notification.attempts < settings.NOTIFICATIONS_MAX_ATTEMPTS:
+            notification.status = Notification.PENDING
+            notification.next_attempt_at = timezone.now() + timedelta(
+                seconds=settings.NOTIFICATIONS_RETRY_DELAY
+                * notification.attempts
+            )
+        else:
+            notification.status = Notification.FAILED
+        failed.append(notification)
+    Notification.objects.filter(pk__in=sent).update(
+        status=Notification.SENT,
+        sent_at=timezone.now(),
+        attempts=F('attempts') + 1,
+        error='',
+    )
+    Notification.objects.bulk_update(
+        failed, ('status', 'attempts', 'error', 'next_attempt_at')
+    )
+    return len(sent), len(failed)
+
+
+def send_notifications_batch(connection, size, ids=None):
+    """
+    Отправляет до size ожидающих уведомлений (только из ids, если заданы).
+
+    Письма уходят частями через одно соединение вне транзакции, результат
+    каждой части сохраняется сразу после ее отправки. Возвращает
+    количество отправленных и неудачных.
+    """
+    sent = failed = 0
+    batch = claim_notifications(size, ids)
+    chunk_size = settings.NOTIFICATIONS_SEND_CHUNK
+    for start in range(0, len(batch), chunk_size):
+        built, results = build_messages(
+            batch[start:start + chunk_size], connection
+        )
+        if built:
+            chunk, messages = zip(*built)
+            results.extend(zip(chunk, deliver(connection, list(messages))))
+        chunk_sent, chunk_failed = save_results(results)
+        sent += chunk_sent
+        failed += chunk_failed
+    return sent, failed
+
+
+def record_metrics(sent, failed, seconds):
+    """
+    Сохраняет показатели последнего запуска отправки и общие счетчики.
+    """
+    rate = sent / seconds if seconds else 0
+    cache.set(METRICS_CACHE_KEY, {
+        'sent': sent,
+        'failed': failed,
+        'seconds': round(seconds, 3),
+        'emails_per_second': round(rate, 2),
+        'finished_at': timezone.now().isoformat(),
+    }, None)
+    for name, value in (('sent', sent), ('failed', failed)):
+        key = f'{METRICS_CACHE_KEY}:{name}_total'
+        cache.add(key, 0, None)
+        cache.incr(key, value)
+        EMAILS.labels('notifications', name).inc(value)
+    logger.info(
+        'Notifications: sent %s, failed %s in %.2f s (%.2f emails/s)',
+        sent, failed, seconds, rate,
+    )
 
 
 @shared_task
-def incomes_reject_send_email(instance_pk, ctx):
-    from projects.models import ProjectParticipants  # noqa
-    date_time = timezone.now()
-    instance = ProjectParticipants.objects.filter(
-        pk=instance_pk).select_related('volunteer__user', 'project').first()
-    ctx.update({
-        'user': instance.volunteer.user,
-        'project': instance.project,
-        'date_time': date_time,
-    })
-    to = [get_user_email(instance.volunteer.user)]
-    IncomesRejectEmail(context=ctx).send(to)
+def send_notifications(ids=None):
+    """
+    Разбирает очередь уведомлений пачками, пока она не опустеет или
+    не закончится квота отправки. Если заданы ids, отправляются только
+    эти уведомления.
+
+    Все пачки отправляются через одно соединение почтового бэкенда,
+    размер пачки ограничивается токенами общего для воркеров token
+    bucket. Запускается после фиксации транзакций, создающих
+    уведомления, и периодически для повторных попыток.
+    """
+    bucket = get_email_bucket()
+    started = monotonic()
+    sent = failed = 0
+    with get_connection() as connection:
+        while True:
+            size = bucket.acquire(
+                settings.NOTIFICATIONS_BATCH_SIZE,
+                timeout=settings.NOTIFICATIONS_RATE_LIMIT_TIMEOUT,
+            )
+            if not size:
+                break
+            batch_sent, batch_failed = send_notifications_batch(
+                connection, size, ids
+            )
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent + batch_failed < size:
+                break
+    record_metrics(sent, failed, monotonic() - started)
+    return sent
@@ -194,6 +194,12 @@ class ProjectParticipantsAdmin(ModelAdmin):
     save_on_top = True
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Project.objects.filter(
+            pk__in={obj.project_id, form.initial.get('project')}
+        ).refresh_participants_count()
+
 
 @register(ProjectIncomes)
 class ProjectIncomesAdmin(ModelAdmin):
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Конфигурация совпадает с Project.SEARCH_CONFIG, по которой строятся
+# поисковые запросы. Миграция не должна зависеть от текущего кода модели,
+# поэтому значение задано явно.
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({row}name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce({row}event_purpose, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce({row}description, '')), 'C')
+"""
+
+CREATE_TRIGGER_SQL = f"""
+CREATE FUNCTION projects_project_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER projects_project_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, event_purpose, description
+ON projects_project
+FOR EACH ROW EXECUTE FUNCTION projects_project_search_vector_update();
+
+UPDATE projects_project SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS projects_project_search_vector_trigger
+ON projects_project;
+DROP FUNCTION IF EXISTS projects_project_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_alter_project_options_alter_volunteer_date_of_birth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_vector_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
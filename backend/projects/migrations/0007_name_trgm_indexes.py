@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:36
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_name_trgm_indexes'),
+        ('projects', '0006_project_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='category_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='project_name_trgm_idx'),
+        ),
+    ]
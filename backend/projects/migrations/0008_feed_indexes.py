@@ -0,0 +1,25 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_name_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='projectincomes',
+            options={'ordering': ('-created_at',), 'verbose_name': 'Заявки волонтеров', 'verbose_name_plural': 'Заявки волонтеров'},
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status_approve', 'approved')), fields=['-start_date_application', 'id'], name='project_approved_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectincomes',
+            index=models.Index(fields=['project', '-created_at'], name='incomes_project_created_idx'),
+        ),
+    ]
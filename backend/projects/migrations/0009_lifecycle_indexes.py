@@ -0,0 +1,21 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status_approve', 'approved')), fields=['end_date_application', 'start_date_application'], name='project_approved_appl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status_approve', 'approved')), fields=['end_datetime', 'end_date_application'], name='project_approved_end_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-17 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_lifecycle_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='max_participants',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Максимальное количество участников'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='participants_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество участников'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE projects_project SET participants_count = (
+                    SELECT COUNT(*) FROM projects_projectparticipants
+                    WHERE projects_projectparticipants.project_id
+                        = projects_project.id
+                );
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-17 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_project_participants_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные варианты фото'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные варианты картинки'),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные варианты фото'),
+        ),
+        migrations.AddField(
+            model_name='volunteer',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные варианты фото'),
+        ),
+    ]
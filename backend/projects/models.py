@@ -2,8 +2,11 @@ from datetime import date
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce, Now, Upper
 
 from content.models import City, Skills
 
@@ -91,6 +94,12 @@ class Organization(models.Model):
         blank=True,
         verbose_name='Фото',
     )
+    photo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные варианты фото',
+    )
 
     class Meta:
         ordering = ['title']
@@ -133,6 +142,12 @@ class Volunteer(models.Model):
         blank=True,
         verbose_name='Фото',
     )
+    photo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные варианты фото',
+    )
     date_of_birth = models.DateField(
         blank=False,
         null=False,
@@ -200,6 +215,12 @@ class Category(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = (
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='category_name_trgm_idx',
+            ),
+        )
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
 
@@ -233,6 +254,232 @@ class Address(models.Model):
         return self.address_line
 
 
+class ProjectQuerySet(models.QuerySet):
+    """
+    Набор запросов для проектов.
+    """
+
+    def with_related(self):
+        """
+        Подгружает связанные данные, необходимые для отображения проекта,
+        фиксированным числом запросов независимо от размера страницы.
+        """
+        # search_vector нужен только для фильтрации, в ответ он не попадает
+        return self.select_related('city', 'event_address').defer(
+            'search_vector'
+        ).prefetch_related(
+            models.Prefetch('skills', queryset=Skills.objects.only('name')),
+            models.Prefetch(
+                'categories', queryset=Category.objects.only('id')
+            ),
+            'photos',
+            models.Prefetch(
+                'participants',
+                queryset=ProjectParticipants.objects.select_related(
+                    'volunteer__user'
+                ).only(
+                    'volunteer__user__first_name',
+                    'volunteer__user__second_name',
+                    'volunteer__user__last_name',
+                ),
+            ),
+        )
+
+    def lifecycle_conditions(self):
+        """
+        Условия этапов жизненного цикла одобренного или отмененного
+        проекта относительно текущего времени БД. Порядок важен: проект
+        получает первый подходящий статус.
+        """
+        now = Now()
+        approved = models.Q(status_approve=Project.APPROVED)
+        return {
+            Project.CANCELED_BY_ORGANIZER: models.Q(
+                status_approve=Project.CANCELED_BY_ORGANIZER
+            ),
+            Project.OPEN: approved & models.Q(
+                start_datetime__lte=now, start_date_application__gt=now
+            ),
+            Project.READY_FOR_FEEDBACK: approved & models.Q(
+                start_date_application__lte=now, end_date_application__gt=now
+            ),
+            Project.RECEPTION_OF_RESPONSES_CLOSED: approved & models.Q(
+                end_date_application__lte=now, end_datetime__gt=now
+            ),
+            Project.PROJECT_COMPLETED: approved & models.Q(
+                end_datetime__lte=now
+            ),
+        }
+
+    def with_status(self):
+        """
+        Аннотирует проекты статусом жизненного цикла (поле status),
+        вычисленным в БД.
+        """
+        conditions = self.lifecycle_conditions()
+        return self.annotate(
+            status=models.Case(
+                *(
+                    models.When(condition, then=models.Value(status))
+                    for status, condition in conditions.items()
+                ),
+                default=models.Value(Project.EDITING),
+                output_field=models.CharField(),
+            )
+        )
+
+    def filter_status(self, status):
+        """
+        Оставляет проекты с указанным статусом жизненного цикла.
+
+        Условие строится из диапазонов дат, а не из аннотации, чтобы
+        использовались частичные индексы по одобренным проектам.
+        """
+        condition = models.Q()
+        for current, current_condition in self.lifecycle_conditions().items():
+            if current == status:
+                return self.filter(condition & current_condition)
+            condition &= ~current_condition
+        return self.filter(condition)
+
+    def cabinet_tabs(self, user):
+        """
+        Условия табов личного кабинета пользователя.
+
+        Участие и избранное проверяются подзапросами EXISTS, поэтому
+        выборка не размножает строки и не требует DISTINCT.
+        """
+        now = Now()
+        favorite = models.Q(
+            models.Exists(
+                ProjectFavorite.objects.filter(
+                    user=user, project=models.OuterRef('pk')
+                )
+            )
+        )
+        if user.is_organizer:
+            own = models.Q(organization__contact_person=user)
+            return {
+                'draft': own & models.Q(
+                    status_approve__in=(Project.EDITING, Project.REJECTED)
+                ),
+                'active': own & models.Q(
+                    status_approve=Project.APPROVED, end_datetime__gt=now
+                ),
+                'completed': own & models.Q(
+                    status_approve=Project.APPROVED, end_datetime__lte=now
+                ),
+                'archive': own & models.Q(
+                    status_approve=Project.CANCELED_BY_ORGANIZER
+                ),
+                'moderation': own & models.Q(status_approve=Project.PENDING),
+                'is_favorited': favorite,
+            }, own | favorite
+        if user.is_volunteer:
+            participant = models.Q(
+                models.Exists(
+                    ProjectParticipants.objects.filter(
+                        volunteer__user=user, project=models.OuterRef('pk')
+                    )
+                )
+            )
+            return {
+                'active': participant & models.Q(
+                    status_approve=Project.APPROVED, end_datetime__gt=now
+                ),
+                'completed': participant & models.Q(
+                    status_approve=Project.APPROVED, end_datetime__lte=now
+                ),
+                'archive': participant & models.Q(
+                    status_approve=Project.CANCELED_BY_ORGANIZER
+                ),
+                'is_favorited': favorite,
+            }, participant | favorite
+        return {}, models.Q(pk__in=())
+
+    def cabinet(self, user):
+        """
+        Проекты личного кабинета: свои (или с участием) и избранные.
+        """
+        return self.filter(self.cabinet_tabs(user)[1])
+
+    def cabinet_counts(self, user):
+        """
+        Количество проектов в каждом табе кабинета одним запросом.
+        """
+        tabs, cabinet = self.cabinet_tabs(user)
+        return self.filter(cabinet).aggregate(
+            **{
+                tab: models.Count('pk', filter=condition)
+                for tab, condition in tabs.items()
+            }
+        )
+
+    def lock(self, ids):
+        """
+        Блокирует строки проектов до конца транзакции в порядке pk.
+
+        Все пути, меняющие участников проекта, сначала блокируют проект и
+        только потом заявки и участников, поэтому параллельные изменения
+        не взаимоблокируются.
+        """
+        return self.select_for_update().filter(pk__in=ids).order_by('pk')
+
+    def take_places(self, project_id, count=1):
+        """
+        Атомарно занимает места в проекте условным UPDATE.
+
+        Строка проекта блокируется до конца транзакции, поэтому
+        параллельные принятия заявок в один проект выполняются по очереди.
+        Возвращает False, если свободных мест не хватает.
+        """
+        return bool(
+            self.filter(pk=project_id)
+            .filter(
+                models.Q(max_participants__isnull=True)
+                | models.Q(
+                    max_participants__gte=models.F('participants_count')
+                    + count
+                )
+            )
+            .update(participants_count=models.F('participants_count') + count)
+        )
+
+    def refresh_participants_count(self):
+        """
+        Пересчитывает счетчик участников по таблице участников.
+        """
+        return self.update(
+            participants_count=Coalesce(
+                models.Subquery(
+                    ProjectParticipants.objects.filter(
+                        project=models.OuterRef('pk')
+                    )
+                    .order_by()
+                    .values('project')
+                    .annotate(count=models.Count('pk'))
+                    .values('count')
+                ),
+                0,
+            )
+        )
+
+    def with_is_favorited(self, user):
+        """
+        Аннотирует проекты признаком нахождения в избранном у пользователя
+        одним подзапросом вместо отдельного запроса на каждый проект.
+        """
+        if not user.is_authenticated:
+            return self.annotate(is_favorited=models.Value(False))
+        return self.annotate(
+            is_favorited=models.Exists(
+                ProjectFavorite.objects.filter(
+                    user=user, project=models.OuterRef('pk')
+                )
+            )
+        )
+
+
 class Project(models.Model):
     """
     Модель представляет собой информацию о проекте.
@@ -255,6 +502,14 @@ class Project(models.Model):
         (REJECTED, 'Отклонено'),
         (CANCELED_BY_ORGANIZER, 'Отменено организатором'),
     ]
+    LIFECYCLE_STATUS_CHOICES = [
+        (OPEN, 'Открыт'),
+        (READY_FOR_FEEDBACK, 'Идет прием заявок'),
+        (RECEPTION_OF_RESPONSES_CLOSED, 'Прием заявок завершен'),
+        (PROJECT_COMPLETED, 'Завершен'),
+        (CANCELED_BY_ORGANIZER, 'Отменен организатором'),
+        (EDITING, 'Черновик'),
+    ]
 
     name = models.CharField(
         max_length=settings.MAX_LEN_NAME_PROJECT,
@@ -276,6 +531,12 @@ class Project(models.Model):
     picture = models.ImageField(
         verbose_name='Картинка',
     )
+    picture_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные варианты картинки',
+    )
     start_datetime = models.DateTimeField(
         blank=True,
         null=True,
@@ -373,6 +634,17 @@ class Project(models.Model):
         related_name='projects',
         verbose_name='Участники',
     )
+    max_participants = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Максимальное количество участников',
+    )
+    # Меняется вместе с участниками проекта, см. take_places
+    participants_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество участников',
+    )
     status_approve = models.CharField(
         max_length=50,
         choices=STATUS_CHOICES,
@@ -400,12 +672,80 @@ class Project(models.Model):
         ],
         verbose_name='Комментарии администратора',
     )
+    # Заполняется триггером БД из name, event_purpose и description
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
+
+    objects = ProjectQuerySet.as_manager()
+
+    # Поля, которые обычное сохранение не перезаписывает, см. save
+    BACKGROUND_FIELDS = ('participants_count', 'picture_variants')
+    # Конфигурация полнотекстового поиска. Вектор строит триггер из
+    # миграции 0006 с той же конфигурацией: при ее смене нужна новая
+    # миграция, пересоздающая триггер и пересчитывающая search_vector.
+    SEARCH_CONFIG = 'russian'
 
     class Meta:
         ordering = ('-start_date_application', 'id')
+        indexes = (
+            GinIndex(
+                fields=('search_vector',), name='project_search_vector_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='project_name_trgm_idx',
+            ),
+            models.Index(
+                fields=('-start_date_application', 'id'),
+                condition=models.Q(status_approve='approved'),
+                name='project_approved_feed_idx',
+            ),
+            models.Index(
+                fields=('end_date_application', 'start_date_application'),
+                condition=models.Q(status_approve='approved'),
+                name='project_approved_appl_idx',
+            ),
+            models.Index(
+                fields=('end_datetime', 'end_date_application'),
+                condition=models.Q(status_approve='approved'),
+                name='project_approved_end_idx',
+            ),
+        )
         verbose_name = 'Проект'
         verbose_name_plural = 'Проекты'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Статус на момент загрузки, чтобы при сохранении видеть его смену
+        if 'status_approve' in field_names:
+            instance._loaded_status_approve = values[
+                field_names.index('status_approve')
+            ]
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счетчик участников меняется только условными UPDATE (take_places,
+        # release_project_place), а варианты изображения - только задачей
+        # make_image_variants. Обычное сохранение записало бы значения,
+        # прочитанные в начале запроса, поверх параллельных изменений
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.BACKGROUND_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return settings.PROJECT.format(
             self.name, self.organization, self.categories, self.city
@@ -422,6 +762,12 @@ class ProjectImage(models.Model):
         default='', null=True, blank=True,
         verbose_name='Фото прошедшего мероприятия'
     )
+    photo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные варианты фото',
+    )
 
 
 class ProjectCategories(models.Model):
@@ -552,12 +898,19 @@ class ProjectIncomes(models.Model):
     )
 
     class Meta:
+        ordering = ('-created_at',)
         constraints = [
             models.UniqueConstraint(
                 fields=['project', 'volunteer', 'status_incomes'],
                 name='%(app_label)s%(class)s_unique_project_volunteer',
             )
         ]
+        indexes = (
+            models.Index(
+                fields=('project', '-created_at'),
+                name='incomes_project_created_idx',
+            ),
+        )
         verbose_name = 'Заявки волонтеров'
         verbose_name_plural = 'Заявки волонтеров'
 
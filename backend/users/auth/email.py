@@ -0,0 +1,55 @@
+from django.db import transaction
+from djoser import email
+
+from api.utils import get_site_data
+
+
+class DeferredEmailMixin:
+    """
+    Миксин писем djoser, которые отправляются задачей Celery после
+    фиксации транзакции, а не во время обработки запроса.
+
+    В задачу передаются id пользователя и данные сайта из запроса,
+    письмо (со ссылками и токенами) собирается уже в воркере.
+    """
+
+    def send(self, to, *args, **kwargs):
+        from users.tasks import send_user_email  # noqa
+
+        email_path = f'{self.__module__}.{self.__class__.__name__}'
+        user_pk = self.context['user'].pk
+        site_data = get_site_data(self.request)
+        transaction.on_commit(
+            lambda: send_user_email.delay(email_path, user_pk, site_data, to)
+        )
+
+    def send_now(self, to, *args, **kwargs):
+        super().send(to, *args, **kwargs)
+
+
+class ActivationEmail(DeferredEmailMixin, email.ActivationEmail):
+    pass
+
+
+class ConfirmationEmail(DeferredEmailMixin, email.ConfirmationEmail):
+    pass
+
+
+class PasswordResetEmail(DeferredEmailMixin, email.PasswordResetEmail):
+    pass
+
+
+class PasswordChangedConfirmationEmail(
+    DeferredEmailMixin, email.PasswordChangedConfirmationEmail
+):
+    pass
+
+
+class UsernameChangedConfirmationEmail(
+    DeferredEmailMixin, email.UsernameChangedConfirmationEmail
+):
+    pass
+
+
+class UsernameResetEmail(DeferredEmailMixin, email.UsernameResetEmail):
+    pass
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
+from django.utils.module_loading import import_string
 
 from backend import celery_app
+from backend.metrics import EMAILS
 
 User = get_user_model()
 
@@ -15,3 +17,18 @@ def delete_not_active_users():
             is_active=False,
             date_joined__lt=tomorrow,
         ).exclude(role=User.DELETED).delete()
+
+
+@celery_app.task(
+    autoretry_for=(Exception,), retry_backoff=True, max_retries=3
+)
+def send_user_email(email_path, user_pk, site_data, to):
+    """
+    Отправляет письмо djoser (активация, сброс пароля и т.д.).
+    """
+    user = User.objects.filter(pk=user_pk).first()
+    if user is None:
+        return
+    email_class = import_string(email_path)
+    email_class(context=dict(site_data, user=user)).send_now(to)
+    EMAILS.labels('auth', 'sent').inc()